@@ -1,26 +1,110 @@
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
 
-load_dotenv()  
+load_dotenv()
 
-mongo_client = None
-db = None
 
-def create_app():
+def create_app(app_settings=None):
+    # Everything the app holds on to (Mongo client, caches, search index,
+    # signer, JWKS keys, models) lives in app.extensions and modules reach it
+    # through the proxies in app/extensions.py, so importing app opens
+    # nothing and two apps in one process never share data. Only the metric
+    # series are per process.
+    from .config import load_settings
+    from .extensions import Mongo
+    settings = app_settings or load_settings()
+
     app = Flask(__name__)
+    app.config["SETTINGS"] = settings
+    from .utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
 
     CORS(app)
 
-    MONGO_URI = os.getenv("MONGO_CLIENT")
+    from .services.metrics import command_listener, init_metrics
+    listeners = [command_listener] if settings.metrics_enabled else []
+    mongo_client = MongoClient(settings.mongo_uri, event_listeners=listeners, **settings.mongo_client_options())
+    catalog_db = mongo_client.get_database(settings.mongo_db, read_preference=settings.catalog_read_pref)
+    app.extensions["mongo"] = Mongo(
+        mongo_client,
+        mongo_client.get_database(settings.mongo_db, read_preference=settings.user_read_pref),
+        catalog_db,
+    )
+
+    from .services.auth import CLERK_JWKS_URL, JWKSKeyStore, VerifiedTokenCache
+    from .services.catalog import CatalogVersion, GenreIndex
+    from .services.executor import FanoutExecutor
+    from .services.movie_cache import MovieCache
+    from .services.posters import PosterCache
+    from .services.search import SearchIndex
+    from .services.storage import create_blob_signer
+    from .services.user_context import UserContextCache
+    app.extensions["movie_cache"] = MovieCache(
+        max_bytes=settings.movie_cache_max_bytes, ttl=settings.movie_cache_ttl, database=catalog_db)
+    app.extensions["genre_index"] = GenreIndex(database=catalog_db, ttl=settings.genre_map_ttl)
+    app.extensions["search_index"] = SearchIndex(
+        database=catalog_db,
+        refresh_seconds=settings.search_refresh_seconds,
+        rebuild_seconds=settings.search_rebuild_seconds,
+    )
+    app.extensions["user_context_cache"] = UserContextCache(settings.user_context_ttl)
+    app.extensions["fanout_executor"] = FanoutExecutor(settings.fanout_workers)
+    app.extensions["poster_cache"] = PosterCache(
+        settings.poster_cache_dir, ttl=settings.poster_cache_ttl, max_files=settings.poster_cache_max_files)
+    app.extensions["jwks_store"] = JWKSKeyStore(
+        CLERK_JWKS_URL, ttl=settings.jwks_cache_ttl, miss_cooldown=settings.jwks_miss_cooldown)
+    app.extensions["verified_tokens"] = VerifiedTokenCache(maxsize=settings.verified_token_cache_size)
+    app.extensions["blob_signer"] = create_blob_signer(
+        expiry_minutes=settings.signed_url_expiry_minutes,
+        bucket_seconds=settings.signed_url_bucket_seconds,
+        cache_size=settings.signed_url_cache_size,
+    )
+
+    # `flask reload-catalog` reaches every worker through this check
+    catalog_version = app.extensions["catalog_version"] = CatalogVersion(
+        database=catalog_db, check_seconds=settings.catalog_check_seconds)
+    catalog_version.on_change(app.extensions["movie_cache"].invalidate)
+    catalog_version.on_change(app.extensions["genre_index"].invalidate)
+    catalog_version.on_change(app.extensions["search_index"].request_rebuild)
+
+    @app.before_request
+    def check_catalog_version():
+        # Health checks and /metrics must answer while Mongo is unreachable
+        if request.blueprint not in ("health", "metrics"):
+            app.extensions["catalog_version"].check()
 
-    global mongo_client, db
-    mongo_client = MongoClient(MONGO_URI)
-    db = mongo_client.movieflix 
+    if settings.metrics_enabled:
+        init_metrics(app, server_timing=settings.server_timing, slow_request_ms=settings.slow_request_ms)
+        stats_sources = app.extensions["stats_sources"] = {"movie_cache": app.extensions["movie_cache"].stats}
+        signer = app.extensions["blob_signer"]
+        if signer is not None:
+            stats_sources["signed_url_cache"] = signer.cache.stats
+
+    if settings.gzip_enabled:
+        # Registered after the metrics hook so it runs first (after_request
+        # handlers run in reverse) and response sizes are bytes on the wire
+        from .utils.compression import init_compression
+        init_compression(app, min_bytes=settings.gzip_min_bytes, level=settings.gzip_level)
 
     from .routes import register_blueprints
     register_blueprints(app)
 
+    from .services.model_store import ModelStore, load_recommender, load_similar_index
+    app.extensions["recommender"] = ModelStore(
+        settings.recommender_model_path or os.path.join(app.instance_path, "recommender.npz"),
+        load_recommender,
+        settings.model_reload_seconds,
+    )
+    app.extensions["similar_index"] = ModelStore(
+        os.path.join(settings.similar_index_path or os.path.join(app.instance_path, "similar"), "CURRENT"),
+        load_similar_index,
+        settings.model_reload_seconds,
+    )
+
+    from .commands import register_commands
+    register_commands(app)
+
     return app
@@ -0,0 +1,106 @@
+import click
+
+
+def register_commands(app):
+    @app.cli.command("rebuild-rating-stats")
+    @click.option("--movie-id", "movie_ids", multiple=True, help="Only rebuild these movies.")
+    def rebuild_rating_stats_command(movie_ids):
+        """Rebuild the rating_stats summaries from the ratings collection."""
+        from app.services.ratings import rebuild_rating_stats
+        count = rebuild_rating_stats(movie_ids)
+        click.echo(f"rating_stats holds {count} movies")
+
+    @app.cli.command("backfill-derived-fields")
+    @click.option("--only-missing", is_flag=True, help="Skip movies that already have the fields.")
+    @click.option("--batch-size", default=1000, show_default=True, help="Updates per bulk_write.")
+    def backfill_derived_fields_command(only_missing, batch_size):
+        """Set release_year and genre_ids on movies_metadata from release_date and genres."""
+        from app.services.catalog import backfill_derived_fields
+        scanned, modified = backfill_derived_fields(batch_size=batch_size, only_missing=only_missing)
+        click.echo(f"scanned {scanned} movies, updated {modified}")
+
+    @app.cli.command("reload-catalog")
+    def reload_catalog_command():
+        """Make every worker drop its cached catalog data and rebuild its search index."""
+        from app.services.catalog import bump_catalog_version
+        version = bump_catalog_version()
+        seconds = app.config["SETTINGS"].catalog_check_seconds
+        click.echo(f"catalog version {version}; workers reload within {seconds}s")
+
+    @app.cli.command("build-recommender")
+    @click.option("--output", default=None, help="Model file (defaults to the configured path).")
+    def build_recommender_command(output):
+        """Build the recommendation model from the catalog, credits and rating_stats."""
+        import os
+        from app.services.recommender import build_model
+        settings = app.config["SETTINGS"]
+        output = output or settings.recommender_model_path or os.path.join(app.instance_path, "recommender.npz")
+        model = build_model()
+        model.save(output)
+        click.echo(
+            f"{len(model.movie_ids)} movies, {len(model.genre_ids)} genres, {len(model.actor_ids)} actors "
+            f"({model.genres.nnz + model.cast.nnz} non-zeros) -> {output}"
+        )
+
+    @app.cli.command("build-similar-index")
+    @click.option("--output", default=None, help="Index directory (defaults to the configured path).")
+    @click.option("--num-perm", default=128, show_default=True, help="MinHash permutations.")
+    @click.option("--bands", default=32, show_default=True, help="LSH bands (must divide --num-perm).")
+    def build_similar_index_command(output, num_perm, bands):
+        """Build the MinHash/LSH keyword index behind /movies/movie/<id>/similar."""
+        import os
+        from app.services.similar import build_index
+        settings = app.config["SETTINGS"]
+        output = output or settings.similar_index_path or os.path.join(app.instance_path, "similar")
+        index = build_index(output, num_perm=num_perm, bands=bands)
+        click.echo(f"{len(index.movie_ids)} movies with keywords, {len(index.tokens)} keyword links -> {output}")
+
+    @app.cli.group("indexes")
+    def indexes_group():
+        """Declare, verify and profile the indexes the routes rely on."""
+
+    @indexes_group.command("ensure")
+    def ensure_indexes_command():
+        """Create the declared indexes (idempotent)."""
+        from app.services.indexes import ensure_indexes
+        failed = False
+        for (collection_name, name), status in ensure_indexes().items():
+            failed = failed or status != "ok"
+            click.echo(f"{collection_name}.{name}: {status}")
+        if failed:
+            raise SystemExit(1)
+
+    @indexes_group.command("check")
+    def check_indexes_command():
+        """Explain every route query shape and report COLLSCANs."""
+        from app.services.indexes import check_query_shapes
+        collscans = 0
+        for label, collection_name, explained in check_query_shapes():
+            status = "COLLSCAN" if explained["collscan"] else "ok"
+            collscans += explained["collscan"]
+            click.echo(f"{status:<9} {collection_name:<16} {label:<28} {explained['plan']}")
+        if collscans:
+            click.echo(f"{collscans} query shape(s) scan a whole collection")
+            raise SystemExit(1)
+
+    @indexes_group.command("report")
+    @click.option("--repeat", default=20, show_default=True, help="Runs per query.")
+    def query_report_command(repeat):
+        """Run the route queries and print latency and docs examined."""
+        from app.services.indexes import query_report
+        click.echo(f"{'query':<28} {'collection':<16} {'p50 ms':>8} {'max ms':>8} {'docs':>8} {'keys':>8} {'ret':>6}  plan")
+        for row in query_report(repeat=repeat):
+            click.echo(
+                f"{row['query']:<28} {row['collection']:<16} {row['p50_ms']:>8} {row['max_ms']:>8} "
+                f"{row['docs_examined']!s:>8} {row['keys_examined']!s:>8} {row['returned']!s:>6}  {row['plan']}"
+            )
+
+    @app.cli.command("show-config")
+    def show_config_command():
+        """Print the validated settings for the current APP_ENV."""
+        from dataclasses import asdict
+        for name, value in asdict(app.config["SETTINGS"]).items():
+            if name == "mongo_uri" and value and "@" in value:
+                scheme, _, rest = value.partition("://")
+                value = f"{scheme}://***@{rest.rsplit('@', 1)[-1]}"
+            click.echo(f"{name:<36} {value}")
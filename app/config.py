@@ -0,0 +1,264 @@
+from dataclasses import dataclass, fields, replace
+import importlib.util
+import os
+import tempfile
+from typing import Optional, Tuple
+from pymongo import ReadPreference
+
+
+class ConfigError(ValueError):
+    pass
+
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+# Wire compressors and the module each needs; pymongo only warns and drops
+# one whose module is missing
+COMPRESSORS = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+@dataclass(frozen=True)
+class Settings:
+    env: str = "development"
+
+    mongo_uri: Optional[str] = None
+    mongo_db: str = "movieflix"
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: Optional[int] = None
+    mongo_connect_timeout_ms: int = 20000
+    mongo_socket_timeout_ms: Optional[int] = None
+    mongo_server_selection_timeout_ms: int = 30000
+    mongo_wait_queue_timeout_ms: Optional[int] = None
+    mongo_compressors: Tuple[str, ...] = ()
+    mongo_zlib_compression_level: int = -1
+    # Catalog collections (movies_metadata, credits, keywords, GridFS) are
+    # almost static and can be served by secondaries; user collections are not
+    catalog_read_preference: str = "primary"
+    user_read_preference: str = "primary"
+
+    signed_url_expiry_minutes: int = 15
+    signed_url_bucket_seconds: int = 300
+    signed_url_cache_size: int = 50000
+
+    # Offline-built models; default to <instance path>/recommender.npz and
+    # <instance path>/similar
+    recommender_model_path: Optional[str] = None
+    similar_index_path: Optional[str] = None
+    model_reload_seconds: int = 10
+
+    metrics_enabled: bool = True
+    server_timing: bool = False
+    slow_request_ms: int = 1000
+
+    # JSON responses at least gzip_min_bytes long are gzipped for clients
+    # that accept it
+    gzip_enabled: bool = True
+    gzip_min_bytes: int = 1024
+    gzip_level: int = 5
+
+    # Most ids one bulk watchlist/preference request may carry
+    bulk_max_items: int = 500
+
+    # In-process caches, one set per app (TTLs in seconds)
+    movie_cache_max_bytes: int = 64 * 1024 * 1024
+    movie_cache_ttl: float = 600
+    # Cross-request cache of user documents; 0 turns it off
+    user_context_ttl: float = 0
+    search_refresh_seconds: int = 300
+    # Full search index rebuild, which also drops edited and deleted movies
+    search_rebuild_seconds: int = 6 * 60 * 60
+    genre_map_ttl: int = 3600
+    # How often workers look for a `flask reload-catalog`; 0 turns it off
+    catalog_check_seconds: int = 10
+    fanout_workers: int = 8
+    # Posters are cached on disk; an empty POSTER_CACHE_DIR turns it off
+    poster_cache_dir: str = os.path.join(tempfile.gettempdir(), "movieflix-posters")
+    poster_cache_ttl: int = 24 * 60 * 60
+    poster_cache_max_files: int = 5000
+    # Cache-Control max-age sent with posters
+    poster_max_age: int = 30 * 24 * 60 * 60
+    jwks_cache_ttl: int = 300
+    jwks_miss_cooldown: int = 30
+    verified_token_cache_size: int = 10000
+
+    # Serving (gunicorn.conf.py). On SIGTERM a worker fails /readyz and keeps
+    # serving for drain_seconds so the load balancer can stop routing to it,
+    # then finishes in-flight requests and exits.
+    drain_seconds: int = 0
+    readiness_timeout_ms: int = 2000
+    # Most popular movies loaded into the movie cache when a worker starts
+    warmup_movies: int = 0
+    ensure_indexes_on_start: bool = False
+
+    def validate(self):
+        errors = []
+        if self.env not in PROFILES:
+            errors.append(f"APP_ENV must be one of {', '.join(PROFILES)}")
+        if not self.mongo_db:
+            errors.append("MONGO_DB must not be empty")
+        if self.mongo_max_pool_size < 1:
+            errors.append("MONGO_MAX_POOL_SIZE must be at least 1")
+        if not 0 <= self.mongo_min_pool_size <= self.mongo_max_pool_size:
+            errors.append("MONGO_MIN_POOL_SIZE must be between 0 and MONGO_MAX_POOL_SIZE")
+        for name in ("mongo_max_idle_time_ms", "mongo_connect_timeout_ms", "mongo_socket_timeout_ms",
+                     "mongo_server_selection_timeout_ms", "mongo_wait_queue_timeout_ms"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                errors.append(f"{name.upper()} must be positive")
+        unknown = set(self.mongo_compressors) - set(COMPRESSORS)
+        if unknown:
+            errors.append(f"MONGO_COMPRESSORS has unknown values {', '.join(sorted(unknown))}")
+        for name in sorted(set(self.mongo_compressors) & set(COMPRESSORS)):
+            if importlib.util.find_spec(COMPRESSORS[name]) is None:
+                errors.append(f"MONGO_COMPRESSORS includes {name}, which needs the {COMPRESSORS[name]} package")
+        if not -1 <= self.mongo_zlib_compression_level <= 9:
+            errors.append("MONGO_ZLIB_COMPRESSION_LEVEL must be between -1 and 9")
+        for name in ("catalog_read_preference", "user_read_preference"):
+            if getattr(self, name) not in READ_PREFERENCES:
+                errors.append(f"{name.upper()} must be one of {', '.join(READ_PREFERENCES)}")
+        if self.signed_url_expiry_minutes < 1:
+            errors.append("SIGNED_URL_EXPIRY_MINUTES must be at least 1")
+        if self.signed_url_bucket_seconds < 1:
+            errors.append("SIGNED_URL_BUCKET_SECONDS must be at least 1")
+        if self.signed_url_cache_size < 0:
+            errors.append("SIGNED_URL_CACHE_SIZE must not be negative")
+        if self.model_reload_seconds < 0:
+            errors.append("MODEL_RELOAD_SECONDS must not be negative")
+        if self.slow_request_ms < 0:
+            errors.append("SLOW_REQUEST_MS must not be negative")
+        if self.gzip_min_bytes < 0:
+            errors.append("GZIP_MIN_BYTES must not be negative")
+        if not 1 <= self.gzip_level <= 9:
+            errors.append("GZIP_LEVEL must be between 1 and 9")
+        if self.bulk_max_items < 1:
+            errors.append("BULK_MAX_ITEMS must be at least 1")
+        for name in ("movie_cache_max_bytes", "movie_cache_ttl", "user_context_ttl", "search_refresh_seconds",
+                     "search_rebuild_seconds", "genre_map_ttl", "catalog_check_seconds", "poster_cache_ttl",
+                     "poster_max_age", "jwks_miss_cooldown", "verified_token_cache_size"):
+            if getattr(self, name) < 0:
+                errors.append(f"{name.upper()} must not be negative")
+        for name in ("fanout_workers", "poster_cache_max_files", "jwks_cache_ttl"):
+            if getattr(self, name) < 1:
+                errors.append(f"{name.upper()} must be at least 1")
+        if self.drain_seconds < 0:
+            errors.append("DRAIN_SECONDS must not be negative")
+        if self.readiness_timeout_ms < 1:
+            errors.append("READINESS_TIMEOUT_MS must be at least 1")
+        if self.warmup_movies < 0:
+            errors.append("WARMUP_MOVIES must not be negative")
+        if errors:
+            raise ConfigError("Invalid configuration: " + "; ".join(errors))
+        return self
+
+    def mongo_client_options(self):
+        options = {
+            "maxPoolSize": self.mongo_max_pool_size,
+            "minPoolSize": self.mongo_min_pool_size,
+            "connectTimeoutMS": self.mongo_connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.mongo_server_selection_timeout_ms,
+        }
+        if self.mongo_max_idle_time_ms is not None:
+            options["maxIdleTimeMS"] = self.mongo_max_idle_time_ms
+        if self.mongo_socket_timeout_ms is not None:
+            options["socketTimeoutMS"] = self.mongo_socket_timeout_ms
+        if self.mongo_wait_queue_timeout_ms is not None:
+            options["waitQueueTimeoutMS"] = self.mongo_wait_queue_timeout_ms
+        if self.mongo_compressors:
+            options["compressors"] = ",".join(self.mongo_compressors)
+            if "zlib" in self.mongo_compressors:
+                options["zlibCompressionLevel"] = self.mongo_zlib_compression_level
+        return options
+
+    @property
+    def catalog_read_pref(self):
+        return READ_PREFERENCES[self.catalog_read_preference]
+
+    @property
+    def user_read_pref(self):
+        return READ_PREFERENCES[self.user_read_preference]
+
+
+# Per-environment defaults; any field can still be overridden from the
+# environment (or .env) by its upper-case name
+PROFILES = {
+    "development": {
+        "mongo_server_selection_timeout_ms": 5000,
+        "server_timing": True,
+    },
+    "testing": {
+        "mongo_max_pool_size": 10,
+        "mongo_server_selection_timeout_ms": 2000,
+        "mongo_connect_timeout_ms": 2000,
+    },
+    "production": {
+        "mongo_max_pool_size": 50,
+        "mongo_min_pool_size": 5,
+        "mongo_max_idle_time_ms": 300000,
+        "mongo_connect_timeout_ms": 5000,
+        "mongo_socket_timeout_ms": 15000,
+        "mongo_server_selection_timeout_ms": 5000,
+        "mongo_wait_queue_timeout_ms": 2000,
+        "mongo_compressors": ("zlib",),
+        "catalog_read_preference": "secondaryPreferred",
+        "drain_seconds": 10,
+        "warmup_movies": 1000,
+    },
+}
+
+# Environment variable names that predate this module
+ENV_ALIASES = {
+    "mongo_uri": "MONGO_CLIENT",
+}
+
+
+def _parse(field, raw):
+    annotation = str(field.type)
+    raw = raw.strip()
+    if "Tuple" in annotation:
+        return tuple(part.strip() for part in raw.split(",") if part.strip())
+    if raw == "" and "Optional" in annotation:
+        return None
+    if "bool" in annotation:
+        if raw.lower() in ("1", "true", "yes", "on"):
+            return True
+        if raw.lower() in ("0", "false", "no", "off", ""):
+            return False
+        raise ConfigError(f"{field.name.upper()} must be true or false, got {raw!r}")
+    if "int" in annotation:
+        try:
+            return int(raw)
+        except ValueError:
+            raise ConfigError(f"{field.name.upper()} must be an integer, got {raw!r}")
+    if "float" in annotation:
+        try:
+            return float(raw)
+        except ValueError:
+            raise ConfigError(f"{field.name.upper()} must be a number, got {raw!r}")
+    return raw
+
+
+def load_settings(environ=None, **overrides):
+    environ = os.environ if environ is None else environ
+    env = environ.get("APP_ENV") or environ.get("FLASK_ENV") or "development"
+    if env not in PROFILES:
+        raise ConfigError(f"APP_ENV must be one of {', '.join(PROFILES)}, got {env!r}")
+
+    values = {"env": env, **PROFILES[env]}
+    for field in fields(Settings):
+        if field.name == "env":
+            continue
+        name = ENV_ALIASES.get(field.name, field.name.upper())
+        if name in environ:
+            values[field.name] = _parse(field, environ[name])
+    values.update(overrides)
+    return Settings(**values).validate()
+
+
+def with_overrides(settings, **overrides):
+    return replace(settings, **overrides).validate()
@@ -0,0 +1,27 @@
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+class Mongo:
+    # The client and database handles create_app builds, kept in
+    # app.extensions["mongo"] so each app (and each forked worker) has its own
+    def __init__(self, client, db, catalog_db):
+        self.client = client
+        self.db = db
+        self.catalog_db = catalog_db
+
+    def close(self):
+        self.client.close()
+
+
+def extension(name, attribute=None):
+    # Module-level handle on a per-app object, looked up on the current app
+    # each time it is used, so modules can import it before any app exists
+    def lookup():
+        value = current_app.extensions[name]
+        return getattr(value, attribute) if attribute else value
+    return LocalProxy(lookup)
+
+
+db = extension("mongo", "db")
+catalog_db = extension("mongo", "catalog_db")
@@ -3,8 +3,13 @@
 from .movie_details import movie_bp
 from .watchlist import watchlist_bp
 from .user_details import user_bp
+from .metrics import metrics_bp
+from .health import health_bp
 
 def register_blueprints(app):
     app.register_blueprint(movie_bp, url_prefix='/movies')
     app.register_blueprint(watchlist_bp, url_prefix='/watchlist')
     app.register_blueprint(user_bp, url_prefix='/user')
+    app.register_blueprint(health_bp)
+    if app.config["SETTINGS"].metrics_enabled:
+        app.register_blueprint(metrics_bp)
@@ -0,0 +1,27 @@
+from flask import Blueprint, current_app, jsonify
+from app.services.lifecycle import check_mongo, is_draining
+from app.services.search import search_index
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is serving requests, nothing else is checked
+    return jsonify({"status": "ok"}), 200
+
+
+@health_bp.route("/readyz", methods=["GET"])
+def readyz():
+    if is_draining():
+        return jsonify({"status": "draining"}), 503
+    settings = current_app.config["SETTINGS"]
+    error = check_mongo(settings.readiness_timeout_ms / 1000)
+    if error:
+        return jsonify({"status": "unavailable", "mongo": "unreachable"}), 503
+    # Workers build the search index in the background after boot; start it
+    # here too in case Mongo was unreachable during warm-up
+    if not search_index.ready:
+        search_index.build_in_background()
+        return jsonify({"status": "unavailable", "mongo": "ok", "search": "building"}), 503
+    return jsonify({"status": "ok", "mongo": "ok"}), 200
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response, current_app
+from app.services.metrics import render_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(current_app.extensions.get("stats_sources")), mimetype="text/plain; version=0.0.4")
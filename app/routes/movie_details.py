@@ -1,19 +1,20 @@
-from datetime import datetime, timedelta
-from app import db
-from flask import Blueprint, request, jsonify, send_file, g
+from datetime import datetime, timezone
+from app.extensions import catalog_db
+from flask import Blueprint, current_app, request, jsonify, send_file, g
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 import math
-import ast
-from app.services.movie import get_signed_url,get_castdetails,get_crewdetails
-from app.utils.helper import paginate, get_liked_genres
-from gridfs import GridFS
-from jose import jwt, JWTError
-import requests
+from app.services.movie import get_signed_url,get_castdetails,get_crewdetails,get_credits,get_shaped_credits,credit_shaping_from_args,ID_ONLY,castdetails_from_credit,crewdetails_from_credit,attach_poster_urls,attach_profile_urls,movie_projection_from_args
+from app.utils.helper import int_arg, paginate, keyset_paginate, get_liked_genres
+from pymongo import ASCENDING, DESCENDING
 from app.services.auth import require_auth
+from app.services.search import search_index
+from app.services.user_context import get_user_context
+from app.services.executor import run_concurrently
+from app.services.movie_cache import movie_cache
+from app.services.posters import get_poster as load_poster, thumbnails_available, THUMBNAIL_WIDTHS
+from app.services.ratings import get_rating_stats, get_ratings_page, record_rating
+from app.services.model_store import get_model
 
-movies_collection = db.movies_metadata
-
-
-fs = GridFS(db)
 movie_bp = Blueprint("movie", __name__)
 
 
@@ -36,70 +37,67 @@ def get_movies():
     limit = int(request.args.get("limit", 10))
     sort_by = request.args.get("sort_by")
     skinny = request.args.get("skinny", "true").lower() != "false"  # Default to True
+    cursor = request.args.get("cursor")  # Present (even empty) switches to cursor pagination
+    next_cursor = None
+    try:
+        projection = movie_projection_from_args(request.args)
+        jobs, cast_limit = credit_shaping_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    user_id = g.user_id
+    user_context = get_user_context()
     movie_ids = []
 
-    watchlist = db.watchlists.find_one({"user_id": user_id})
-    watchlisted_ids = set(watchlist.get("movie_ids", [])) if watchlist else set()
-
-    user_details = db.user_details.find_one({"user_id": user_id})
-    liked_movies_data = user_details.get("movie_ids", []) if user_details else []
-    
-    liked_lookup = {
-        str(entry["movie_id"]): entry["preference"]
-        for entry in liked_movies_data
-    }
     if keyword:
-        # First check by title and then by keywords
-        matched_title = db.movies_metadata.find(
-            {"title": {"$regex": keyword, "$options": "i"}},
-            {"id": 1}
-        )
-        movie_ids = [doc["id"] for doc in matched_title]
-
-        if not movie_ids:
-            matched_keywords = db.keywords.find(
-                {"keywords.name": {"$regex": keyword, "$options": "i"}},
-                {"id": 1}
-            )
-            movie_ids = [doc["id"] for doc in matched_keywords]
-
-        movies_cursor = db.movies_metadata.find(
-            {"id": {"$in": movie_ids}}
-        )
-
-        total_count = db.movies_metadata.count_documents({"id": {"$in": movie_ids}})
-    elif sort_by:
-        movies_cursor = db.movies_metadata.find().sort(sort_by, -1)
-        total_count = db.movies_metadata.estimated_document_count()
+        # Ranked page and exact total from the in-process search index
+        movie_ids, total_count = search_index.search(keyword, (page - 1) * limit, limit)
+    elif cursor is not None:
+        try:
+            if sort_by:
+                page_ids, next_cursor = keyset_paginate(catalog_db.movies_metadata, {}, sort_by, DESCENDING, cursor, limit, ID_ONLY)
+            else:
+                page_ids, next_cursor = keyset_paginate(catalog_db.movies_metadata, {}, "_id", ASCENDING, cursor, limit, ID_ONLY)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        movie_ids = [movie["id"] for movie in page_ids]
+        total_count = catalog_db.movies_metadata.estimated_document_count()
     else:
-        movies_cursor = db.movies_metadata.find()
-        total_count = db.movies_metadata.estimated_document_count()
-        
-    movies_cursor, _ = paginate(movies_cursor, page, limit)
-    
-    movie_list = list(movies_cursor)
+        if sort_by:
+            movies_cursor = catalog_db.movies_metadata.find({}, ID_ONLY).sort(sort_by, -1)
+        else:
+            movies_cursor = catalog_db.movies_metadata.find({}, ID_ONLY)
+        total_count = catalog_db.movies_metadata.estimated_document_count()
+
+        movies_cursor, _ = paginate(movies_cursor, page, limit)
+        movie_ids = [movie["id"] for movie in movies_cursor]
+
+    # Page ids come from Mongo, the documents from the catalog cache
+    movie_list = movie_cache.ordered(movie_ids, projection)
+
     movie_ids = [movie["id"] for movie in movie_list]
 
-    # Batch fetch credits
-    credits = db.credits.find({"id": {"$in": movie_ids}})
-    credits_map = {c["id"]: c for c in credits}
+    # Batch fetch credits, crew filtered and cast trimmed by Mongo
+    credits_map = {} if skinny else get_shaped_credits(movie_ids, jobs, cast_limit)
 
-    # Get liked actor ids once
-    liked_actor_ids = set(user_details.get("actor_ids", [])) if user_details else set()
-    liked_genre_ids = set(user_details.get("genre_ids", [])) if user_details else set()
+    liked_actor_ids = user_context.liked_actor_ids
+    liked_genre_ids = user_context.liked_genre_ids
     
+    attach_poster_urls(movie_list)
+    if not skinny:
+        # Sign every cast and crew photo on the page in one batch
+        people = []
+        for credit in credits_map.values():
+            people.extend(credit.get("cast", []))
+            people.extend(credit["crew"])
+        attach_profile_urls(people)
+
     movies = []
     for movie in movie_list:
         movie = get_liked_genres(movie, liked_genre_ids)
-        movie["_id"] = str(movie["_id"])
         movie_id = movie.get("id")
-        poster = get_signed_url(f"posters/{movie_id}.jpg")
-        movie["poster_url"] = poster["signed_url"]
-        movie["is_watchlisted"] = movie_id in watchlisted_ids
+        movie["is_watchlisted"] = movie_id in user_context.watchlisted_ids
         
-        preference = liked_lookup.get(movie_id)
+        preference = user_context.liked_lookup.get(movie_id)
         movie["watched"] = preference is not None
         movie["preference"] = preference 
         
@@ -110,29 +108,100 @@ def get_movies():
                 cast = credit.get("cast", [])
                 for c in cast:
                     if c.get('id'):
-                        c['profile_url'] = get_signed_url(f"tmdb_profile_photos/{c['id']}.jpg").get('signed_url')
                         c["is_liked"] = c['id'] in liked_actor_ids
                 movie["castdata"] = cast
-
-                # Build crewdetails
-                targetjobs = {"Executive Producer", "Original Music Composer", "Director"}
-                crew = []
-                for c in credit.get('crew', []):
-                    if c.get('job') in targetjobs:
-                        c['profile_url'] = get_signed_url(f"tmdb_profile_photos/{c['id']}.jpg").get('signed_url')
-                        crew.append(c)
-                movie["crewdetails"] = crew
+                movie["crewdetails"] = credit["crew"]
             else:
                 movie["castdata"] = {}
                 movie["crewdetails"] = []
         
         movies.append(movie)
 
-    return jsonify({
+    response = {
         "page": page,
         "total_pages": math.ceil(total_count / limit),
         "total_movies": total_count,
         "movies": movies
+    }
+    if cursor is not None and not keyword:
+        response["next_cursor"] = next_cursor
+    return jsonify(response), 200
+
+
+@movie_bp.route("/movie/<movie_id>/similar", methods=["GET"])
+@require_auth
+def get_similar(movie_id):
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+    try:
+        projection = movie_projection_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    index = get_model("similar_index")
+    if index is None:
+        return jsonify({"error": "Similar movies are not available yet"}), 503
+
+    similar = index.similar(movie_id, limit)
+    if similar is None:
+        # Not indexed: either unknown or a movie without keywords
+        if not movie_cache.get(movie_id, ID_ONLY):
+            return jsonify({"error": "Movie Not Found"}), 404
+        similar = []
+    similarity = dict(similar)
+
+    movies = movie_cache.ordered([similar_id for similar_id, _ in similar], projection)
+    attach_poster_urls(movies)
+    for movie in movies:
+        movie["similarity"] = round(similarity.get(movie.get("id"), 0.0), 4)
+    return jsonify({"movie_id": movie_id, "movies": movies}), 200
+
+
+@movie_bp.route("/recommended", methods=["GET"])
+@require_auth
+def get_recommended():
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+    try:
+        projection = movie_projection_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    model = get_model("recommender")
+    if model is None:
+        return jsonify({"error": "Recommendations are not available yet"}), 503
+
+    user_context = get_user_context()
+    liked = [movie_id for movie_id, preference in user_context.liked_lookup.items() if preference == "Like"]
+    disliked = [movie_id for movie_id, preference in user_context.liked_lookup.items() if preference == "Dislike"]
+    # Watched (any preference) and watchlisted titles are never recommended
+    recommended = model.recommend(
+        liked_movie_ids=liked,
+        disliked_movie_ids=disliked,
+        liked_genre_ids=user_context.liked_genre_ids,
+        liked_actor_ids=user_context.liked_actor_ids,
+        exclude_ids=list(user_context.liked_lookup) + user_context.watchlist_ids,
+        limit=limit,
+    )
+    scores = dict(recommended)
+
+    movies = movie_cache.ordered([movie_id for movie_id, _ in recommended], projection)
+    attach_poster_urls(movies)
+    for movie in movies:
+        get_liked_genres(movie, user_context.liked_genre_ids)
+        movie["score"] = round(scores.get(movie.get("id"), 0.0), 4)
+
+    return jsonify({
+        "movies": movies,
+        "model_built_at": datetime.fromtimestamp(model.built_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
     }), 200
 
 
@@ -140,57 +209,123 @@ def get_movies():
 @require_auth
 def get_movie_details(movie_id):
     user_id = g.user_id
-    movie = db.movies_metadata.find_one({"id": movie_id})
+    try:
+        jobs, cast_limit = credit_shaping_from_args(request.args)
+        ratings_page = int_arg(request.args, "ratings_page", 1)
+        ratings_limit = int_arg(request.args, "ratings_limit", 100, maximum=100)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    include_ratings = request.args.get("include_ratings", "false").lower() == "true"
+
+    # Independent lookups run concurrently on the shared pool; credits are
+    # fetched once and split into cast and crew below
+    calls = [
+        (movie_cache.get, movie_id),
+        (get_user_context, user_id),
+        (get_rating_stats, movie_id),
+        (get_credits, movie_id, jobs, cast_limit),
+    ]
+    # Raw ratings are opt-in and paginated, the summary is enough for the view
+    if include_ratings:
+        calls.append((get_ratings_page, movie_id, ratings_page, ratings_limit))
+    movie, user_context, rating_stats, credit, *rest = run_concurrently(*calls)
+    ratings = rest[0] if rest else []
+
     if not movie:
         return jsonify({"error": "Movie not found"}), 404
 
-    movie["_id"] = str(movie["_id"])
-    
-    watchlist = db.watchlists.find_one({"user_id": user_id})
-    watchlisted_ids = set(watchlist["movie_ids"]) if watchlist and "movie_ids" in watchlist else set()
-    
-    user_details = db.user_details.find_one({"user_id": user_id})
-    liked_movies_data = user_details.get("movie_ids", []) if user_details else []
-    
-    liked_genre_ids = set(user_details.get("genre_ids", [])) if user_details else set()
-        
-    
-    liked_lookup = {
-        str(entry["movie_id"]): entry["preference"]
-        for entry in liked_movies_data
-    }
-
-    movie = get_liked_genres(movie, liked_genre_ids)
-    ratings_cursor = db.ratings.find({"movieId": movie_id})
-    ratings = [{"userId": r["userId"], "rating": r["rating"], "timestamp": r["timestamp"]} for r in ratings_cursor]
-
-    average_rating = round(sum(each_rating["rating"] for each_rating in ratings) / len(ratings) if ratings else 0, 2)
-
-    movie["ratings"] = average_rating
-    poster = get_signed_url(f"posters/{movie_id}.jpg")
-    movie["poster_url"] = poster["signed_url"]
-    movie["is_watchlisted"] = movie_id in watchlisted_ids
-    preference = liked_lookup.get(movie_id)
+    movie = get_liked_genres(movie, user_context.liked_genre_ids)
+    movie["ratings"] = rating_stats["mean"]
+    attach_poster_urls([movie])
+    movie["is_watchlisted"] = movie_id in user_context.watchlisted_ids
+    preference = user_context.liked_lookup.get(movie_id)
     movie["watched"] = preference is not None
     movie["preference"] = preference 
     
-    castdata = get_castdetails(movie_id, user_id)
-    crewdetails = get_crewdetails(movie_id)
+    castdata = castdetails_from_credit(credit, user_context.liked_actor_ids)
+    crewdetails = crewdetails_from_credit(credit)
     return jsonify({
         "movie": movie,
         "ratings": ratings,
+        "rating_stats": rating_stats,
         "castdata": castdata,
         "crewdetails": crewdetails
     }), 200
 
 
+@movie_bp.route("/movie/<string:movie_id>/ratings", methods=["GET"])
+@require_auth
+def get_movie_ratings(movie_id):
+    try:
+        page = int_arg(request.args, "page", 1)
+        limit = int_arg(request.args, "limit", 100, maximum=100)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rating_stats = get_rating_stats(movie_id)
+    return jsonify({
+        "page": page,
+        "total_pages": math.ceil(rating_stats["count"] / limit),
+        "total_ratings": rating_stats["count"],
+        "ratings": get_ratings_page(movie_id, page, limit)
+    }), 200
+
+
+@movie_bp.route("/movie/<string:movie_id>/rating", methods=["POST"])
+@require_auth
+def rate_movie(movie_id):
+    data = request.json or {}
+    try:
+        rating = float(data.get("rating"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "rating is required"}), 400
+    # NaN would slip through the comparisons below
+    if not math.isfinite(rating):
+        return jsonify({"error": "rating must be a number"}), 400
+    if rating < 0.5 or rating > 5 or (rating * 2) != int(rating * 2):
+        return jsonify({"error": "rating must be between 0.5 and 5 in half-star steps"}), 400
+
+    if not movie_cache.get(movie_id, ID_ONLY):
+        return jsonify({"error": "Movie not found"}), 404
+
+    created = record_rating(movie_id, g.user_id, rating)
+    return jsonify({
+        "message": "Rating added" if created else "Rating updated",
+        "rating_stats": get_rating_stats(movie_id)
+    }), 201 if created else 200
+
+
 
 @movie_bp.route("/poster/<movie_id>", methods=["GET"])
 def get_poster(movie_id):
-    file = fs.find_one({"filename": str(movie_id)})
-    if not file:
+    width = request.args.get("w", type=int)
+    if width is not None and width not in THUMBNAIL_WIDTHS:
+        return jsonify({"error": f"w must be one of {', '.join(map(str, sorted(THUMBNAIL_WIDTHS)))}"}), 400
+    if width is not None and not thumbnails_available():
+        return jsonify({"error": "Resized posters are not available on this server"}), 501
+
+    poster = load_poster(catalog_db, movie_id, width)
+    if not poster:
         return jsonify({"error": "Poster not found"}), 404
-    return send_file(file, mimetype=file.content_type)
+
+    # send_file answers If-None-Match / If-Modified-Since with 304 and Range
+    # with 206 once it knows the size; a GridOut's comes from GridFS
+    response = send_file(
+        poster.source,
+        mimetype=poster.content_type,
+        conditional=poster.length is None,
+        etag=poster.etag,
+        last_modified=poster.last_modified,
+        max_age=current_app.config["SETTINGS"].poster_max_age,
+    )
+    if poster.length is not None:
+        response.content_length = poster.length
+        try:
+            response.make_conditional(request, accept_ranges=True, complete_length=poster.length)
+        except RequestedRangeNotSatisfiable:
+            poster.source.close()
+            raise
+    response.cache_control.public = True
+    return response
 
 @movie_bp.route('/get-signed-url', methods=['POST'])
 def get_signed_url_route():   
@@ -209,7 +344,11 @@ def get_signed_url_route():
 def castdetails():
     user_id = g.user_id
     movie_id = request.args.get("movie_id")
-    return get_castdetails(movie_id, user_id)
+    try:
+        _, cast_limit = credit_shaping_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return get_castdetails(movie_id, user_id, cast_limit)
 
 
 @movie_bp.route('/keywords', methods=['POST'])
@@ -218,7 +357,7 @@ def get_keywords():
     data = request.json
     movie_ids = data.get("movie_ids")
 
-    keywords = db.keywords.find({"id": {"$in": movie_ids}})
+    keywords = catalog_db.keywords.find({"id": {"$in": movie_ids}})
 
     keywords_list = []
     for keyword in keywords:
@@ -234,4 +373,8 @@ def get_keywords():
 @movie_bp.route('/crewdetails')
 def crewdetails():
     movie_id = request.args.get("movie_id")
-    return get_crewdetails(movie_id)
+    try:
+        jobs, _ = credit_shaping_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return get_crewdetails(movie_id, jobs)
@@ -1,14 +1,17 @@
-from app import db
-from flask import Blueprint, request, jsonify, send_file, g
-from app.utils.helper import paginate, get_genre_list
+from app.extensions import db
+from flask import Blueprint, request, jsonify, send_file, g, Response, current_app, stream_with_context
+from app.utils.helper import int_arg, paginate, get_genre_list
 from app.services.watchlist import paginate_list
 from app.services.movie import get_signed_url
 import math
 from app.services.auth import require_auth
-from app.services.movie import fetch_movies
-
-
-user_details_collection = db.user_details
+from app.services.movie import fetch_movies, iter_movies, movie_projection_from_args
+from app.services.user_context import get_user_context, invalidate_user_context
+from app.services.preferences import (
+    add_to_set, push_movie_entry, add_many_to_sets, push_movie_entries, parse_movie_id, parse_int_id,
+    screen_ids, screened_results, CREATED, ADDED, EXISTS,
+)
+from app.services.catalog import existing_movie_ids, genre_index
 
 
 user_bp = Blueprint("user", __name__)
@@ -23,27 +26,13 @@ def create_or_update_liked_actors():
     if not user_id or not actor_id:
         return jsonify({"error": "user_id and actor_id are required"}), 400
 
-    user_details = user_details_collection.find_one({"user_id": user_id})
-    if user_details:
-        # Use .get with default empty list to avoid KeyError
-        actor_ids = user_details.get("actor_ids", [])
-
-        if actor_id not in actor_ids:
-            actor_ids.append(actor_id)
-            user_details_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"actor_ids": actor_ids}}
-            )
-            return jsonify({"message": "Actor added to liked list"}), 200
-        else:
-            return jsonify({"message": "Actor already liked"}), 400
-    else:
-        # Create new document with actor_ids list
-        user_details_collection.insert_one({
-            "user_id": user_id,
-            "actor_ids": [actor_id]
-        })
+    status = add_to_set(db.user_details, user_id, "actor_ids", actor_id)
+    invalidate_user_context(user_id)
+    if status == CREATED:
         return jsonify({"message": "Liked actor list created"}), 200
+    if status == ADDED:
+        return jsonify({"message": "Actor added to liked list"}), 200
+    return jsonify({"message": "Actor already liked"}), 400
 
 
 @user_bp.route("/remove_liked_actor", methods=["DELETE"])
@@ -55,10 +44,11 @@ def remove_liked_actor():
     if not actor_id:
         return jsonify({"error": "actor_id is required"}), 400
 
-    result = user_details_collection.update_one(
+    result = db.user_details.update_one(
         {"user_id": user_id},
         {"$pull": {"actor_ids": int(actor_id)}}
     )
+    invalidate_user_context(user_id)
 
     if result.modified_count == 0:
         return jsonify({"message": "Actor was not in Liked Actors or already removed"}), 200
@@ -81,26 +71,10 @@ def create_or_update_liked_movie():
     movie_id = str(movie_id)
     new_entry = {"movie_id": movie_id, "preference": preference}
 
-    user_details = user_details_collection.find_one({"user_id": user_id})
-    if user_details:
-        movie_entries = user_details.get("movie_ids", [])
-
-        # Check if movie_id already exists
-        if any(entry.get("movie_id") == movie_id for entry in movie_entries):
-            return jsonify({"message": "Movie already liked"}), 400
-
-        movie_entries.append(new_entry)
-
-        user_details_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"movie_ids": movie_entries}}
-        )
-        
-    else:
-        user_details_collection.insert_one({
-            "user_id": user_id,
-            "movie_ids": [new_entry]
-        })
+    status = push_movie_entry(user_id, new_entry, db.user_details)
+    if status == EXISTS:
+        return jsonify({"message": "Movie already liked"}), 400
+    invalidate_user_context(user_id)
     
     return jsonify({"message": "Movie added to preferred list"}), 201
 
@@ -114,10 +88,11 @@ def remove_liked_movie():
     if not movie_id:
         return jsonify({"error": "movie_id is required"}), 400
 
-    result = user_details_collection.update_one(
+    result = db.user_details.update_one(
         {"user_id": user_id},
         {"$pull": {"movie_ids": {"movie_id": str(movie_id)}}}
     )
+    invalidate_user_context(user_id)
 
     if result.modified_count == 0:
         return jsonify({"message": "Movie was not in preferred movies or already removed"}), 400
@@ -134,27 +109,13 @@ def create_or_update_liked_genres():
     if not user_id or not genre_id:
         return jsonify({"error": "user_id and genre_id are required"}), 400
 
-    user_details = user_details_collection.find_one({"user_id": user_id})
-    if user_details:
-        # Use .get with default empty list to avoid KeyError
-        genre_ids = user_details.get("genre_ids", [])
-
-        if genre_id not in genre_ids:
-            genre_ids.append(genre_id)
-            user_details_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"genre_ids": genre_ids}}
-            )
-            return jsonify({"message": "Genre added to liked list"}), 200
-        else:
-            return jsonify({"message": "Genre already liked"}), 400
-    else:
-        # Create new document with actor_ids list
-        user_details_collection.insert_one({
-            "user_id": user_id,
-            "genre_ids": [genre_id]
-        })
+    status = add_to_set(db.user_details, user_id, "genre_ids", genre_id)
+    invalidate_user_context(user_id)
+    if status == CREATED:
         return jsonify({"message": "Liked genre list created"}), 200
+    if status == ADDED:
+        return jsonify({"message": "Genre added to liked list"}), 200
+    return jsonify({"message": "Genre already liked"}), 400
 
 
 @user_bp.route("/remove_liked_genre", methods=["DELETE"])
@@ -166,10 +127,11 @@ def remove_liked_genre():
     if not genre_id:
         return jsonify({"error": "genre_id is required"}), 400
 
-    result = user_details_collection.update_one(
+    result = db.user_details.update_one(
         {"user_id": user_id},
         {"$pull": {"genre_ids": int(genre_id)}}
     )
+    invalidate_user_context(user_id)
 
     if result.modified_count == 0:
         return jsonify({"message": "Genre was not in Liked Genres or already removed"}), 200
@@ -177,18 +139,92 @@ def remove_liked_genre():
     return jsonify({"message": "Genre removed from Liked Genres"}), 200
 
 
+@user_bp.route("/bulk_add_preferences", methods=["POST"])
+@require_auth
+def bulk_add_preferences():
+    # {"movies": [{"movie_id", "preference"}], "actor_ids": [...], "genre_ids": [...]},
+    # any of them optional. Movies are checked against the catalog and genres
+    # against the known genre ids; actor ids only have to be integers.
+    data = request.get_json(silent=True)
+    user_id = g.user_id
+
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    movies = data.get("movies") or []
+    actor_ids = data.get("actor_ids") or []
+    genre_ids = data.get("genre_ids") or []
+    if not all(isinstance(values, list) for values in (movies, actor_ids, genre_ids)):
+        return jsonify({"error": "movies, actor_ids and genre_ids must be lists"}), 400
+    total = len(movies) + len(actor_ids) + len(genre_ids)
+    if not total:
+        return jsonify({"error": "movies, actor_ids or genre_ids is required"}), 400
+    max_items = current_app.config["SETTINGS"].bulk_max_items
+    if total > max_items:
+        return jsonify({"error": f"At most {max_items} items per request"}), 400
+
+    def parse_movie_entry(item):
+        if not isinstance(item, dict) or not isinstance(item.get("preference", "like"), str):
+            raise ValueError("movies must be {movie_id, preference} objects")
+        return parse_movie_id(item.get("movie_id"))
+
+    screened_movies = screen_ids(movies, parse_movie_entry, existing_movie_ids)
+    screened_actors = screen_ids(actor_ids, parse_int_id)
+    screened_genres = screen_ids(genre_ids, parse_int_id, lambda ids: genre_index.known_ids())
+    entries = [
+        {"movie_id": movie_id, "preference": item.get("preference", "like")}
+        for item, movie_id, status in screened_movies if status is None
+    ]
+    new_actors = [actor_id for _, actor_id, status in screened_actors if status is None]
+    new_genres = [genre_id for _, genre_id, status in screened_genres if status is None]
+
+    added_movies, added_actors, added_genres = set(), set(), set()
+    if entries or new_actors or new_genres:
+        # Actors and genres go in with the upsert that also makes sure the
+        # document exists; its previous state says what was new
+        before = add_many_to_sets(
+            db.user_details, user_id, {"actor_ids": new_actors, "genre_ids": new_genres},
+            projection={"actor_ids": 1, "genre_ids": 1, "movie_ids.movie_id": 1},
+        )
+        added_actors = set(new_actors) - set(before.get("actor_ids", []))
+        added_genres = set(new_genres) - set(before.get("genre_ids", []))
+        liked = {entry.get("movie_id") for entry in before.get("movie_ids", [])}
+        entries = [entry for entry in entries if entry["movie_id"] not in liked]
+        if entries:
+            added_movies = push_movie_entries(user_id, entries, db.user_details)
+
+    added = len(added_movies) + len(added_actors) + len(added_genres)
+    if added:
+        invalidate_user_context(user_id)
+    # Report rejected entries by their movie_id rather than the whole object
+    screened_movies = [
+        (item.get("movie_id") if isinstance(item, dict) else item, movie_id, status)
+        for item, movie_id, status in screened_movies
+    ]
+    return jsonify({
+        "movies": screened_results(screened_movies, "movie_id", added_movies),
+        "actor_ids": screened_results(screened_actors, "actor_id", added_actors),
+        "genre_ids": screened_results(screened_genres, "genre_id", added_genres),
+        "added": added,
+    }), 200
+
 
 @user_bp.route("/user_preference", methods=["GET"])
 @require_auth
 def get_user_preferences():
     user_id = g.user_id
 
-    # Get user detail document
-    user_details = db.user_details.find_one({"user_id": user_id}) or {}
-    watchlist = db.watchlists.find_one({"user_id": user_id}) or {}
+    try:
+        projection = movie_projection_from_args(request.args)
+        # Without a limit every section comes back whole
+        page = int_arg(request.args, "page", 1)
+        limit = int_arg(request.args, "limit", None, maximum=100)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_context = get_user_context(user_id)
 
-    liked_movie_entries = user_details.get("movie_ids", [])
-    watchlisted_ids = watchlist.get("movie_ids", [])
+    liked_movie_entries = user_context.movie_entries
+    watchlisted_ids = user_context.watchlist_ids
 
     liked_ids = []
     watched_ids = []
@@ -203,8 +239,37 @@ def get_user_preferences():
             if preference == "Like":
                 liked_ids.append(movie_id)
             
-    return jsonify({
-        "liked_movies": fetch_movies(liked_ids),
-        "watched_movies": fetch_movies(watched_ids),
-        "watchlisted_movies": fetch_movies(watchlisted_ids)
-    }), 200
+    sections = {
+        "liked_movies": liked_ids,
+        "watched_movies": watched_ids,
+        "watchlisted_movies": watchlisted_ids,
+    }
+    section = request.args.get("section")
+    if section:
+        if section not in sections:
+            return jsonify({"error": f"section must be one of {', '.join(sections)}"}), 400
+        sections = {section: sections[section]}
+
+    if request.args.get("format") == "ndjson":
+        # One {"section", "movie"} object per line, produced as the cursors go
+        def generate():
+            for name, ids in sections.items():
+                for movie in iter_movies(ids, projection):
+                    yield current_app.json.dumps({"section": name, "movie": movie}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if limit is None:
+        return jsonify({
+            name: fetch_movies(ids, projection) for name, ids in sections.items()
+        }), 200
+
+    # Per-section pagination: every section returns the same page
+    response = {
+        name: fetch_movies(paginate_list(ids, page, limit), projection)
+        for name, ids in sections.items()
+    }
+    response["page"] = page
+    response["totals"] = {name: len(ids) for name, ids in sections.items()}
+    response["total_pages"] = {name: math.ceil(len(ids) / limit) for name, ids in sections.items()}
+    return jsonify(response), 200
@@ -1,14 +1,15 @@
 
-from app import db
-from flask import Blueprint, request, jsonify, send_file, g
-from app.utils.helper import paginate, get_genre_list
+from app.extensions import db, catalog_db
+from flask import Blueprint, request, jsonify, send_file, g, current_app
+from app.utils.helper import facet_paginate, keyset_facet_paginate, get_genre_list
 from app.services.watchlist import paginate_list
-from app.services.movie import get_signed_url
+from app.services.movie import attach_poster_urls, movie_projection_from_args, ID_ONLY
+from app.services.movie_cache import movie_cache
+from app.services.catalog import existing_movie_ids, genre_index
 import math
 from app.services.auth import require_auth
-
-
-watchlist_collection = db.watchlist
+from app.services.user_context import get_user_context, invalidate_user_context
+from app.services.preferences import add_to_set, add_many_to_sets, parse_movie_id, screen_ids, screened_results, EXISTS
 
 
 watchlist_bp = Blueprint("watchlist", __name__)
@@ -24,27 +25,42 @@ def create_or_update_watchlist():
     if not user_id or not movie_id:
         return jsonify({"error": "user_id and movie_id are required"}), 400
 
-    watchlist = db.watchlists.find_one({"user_id": user_id})
-    if watchlist:
-        if movie_id not in watchlist["movie_ids"]:
-            watchlist["movie_ids"].append(movie_id)
-            new_movie_ids = watchlist["movie_ids"]
-            db.watchlists.update_one(
-                {"user_id": user_id},
-                {"$set": {"movie_ids": new_movie_ids}}
-            )
-        else:
-            return jsonify({"message": "Movie already in Watchlist"}), 400
-    else:
-        # Create new watchlist doc
-        db.watchlists.insert_one({
-            "user_id": user_id,
-            "movie_ids": [movie_id]
-        })
+    status = add_to_set(db.watchlists, user_id, "movie_ids", movie_id)
+    if status == EXISTS:
+        return jsonify({"message": "Movie already in Watchlist"}), 400
+    invalidate_user_context(user_id)
 
     return jsonify({"message": "Watchlist updated"}), 200
 
 
+@watchlist_bp.route("/bulk_create", methods=["POST"])
+@require_auth
+def bulk_create_watchlist():
+    # Adds up to BULK_MAX_ITEMS movies in one write and reports each one as
+    # added, exists, not_found, invalid or duplicate
+    data = request.get_json(silent=True)
+    user_id = g.user_id
+
+    raw_ids = data.get("movie_ids") if isinstance(data, dict) else None
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return jsonify({"error": "movie_ids must be a non-empty list"}), 400
+    max_items = current_app.config["SETTINGS"].bulk_max_items
+    if len(raw_ids) > max_items:
+        return jsonify({"error": f"At most {max_items} movie_ids per request"}), 400
+
+    screened = screen_ids(raw_ids, parse_movie_id, existing_movie_ids)
+    movie_ids = [movie_id for _, movie_id, status in screened if status is None]
+    added = set()
+    if movie_ids:
+        before = add_many_to_sets(db.watchlists, user_id, {"movie_ids": movie_ids})
+        added = set(movie_ids) - set(before.get("movie_ids", []))
+    if added:
+        invalidate_user_context(user_id)
+
+    results = screened_results(screened, "movie_id", added)
+    return jsonify({"results": results, "added": len(added)}), 200
+
+
 @watchlist_bp.route("/get", methods=["GET"])
 @require_auth
 def get_watchlist():
@@ -54,15 +70,19 @@ def get_watchlist():
     search = request.args.get("search")
     year = request.args.get("year")  
     genre = request.args.get("genre")  
+    cursor = request.args.get("cursor")  # Present (even empty) switches to cursor pagination
 
     if not user_id:
         return jsonify({"error": "user_id required"}), 400
 
-    watchlist = db.watchlists.find_one({"user_id": user_id})
-    if not watchlist or not watchlist.get("movie_ids"):
-        return jsonify({"message": "No movies in your watchlist"}), 404
+    try:
+        projection = movie_projection_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    movie_ids = watchlist["movie_ids"]
+    movie_ids = get_user_context(user_id).watchlist_ids
+    if not movie_ids:
+        return jsonify({"message": "No movies in your watchlist"}), 404
 
     # Base query
     query = {"id": {"$in": movie_ids}}
@@ -71,36 +91,37 @@ def get_watchlist():
         query["title"] = {"$regex": search, "$options": "i"}
 
     if genre:
-        query["genres.name"] = {"$regex": genre, "$options": "i"} 
+        query["genre_ids"] = {"$in": genre_index.ids_matching(genre)}
 
     if year:
-        query["$expr"] = {
-            "$eq": [
-                {"$substr": ["$release_date", 0, 4]},
-                str(year)
-            ]
-        }
-
-    total_count = db.movies_metadata.count_documents(query)
-    
-    raw_cursor = db.movies_metadata.find(query).sort("title", 1)
-
-    movies_cursor, _ = paginate(raw_cursor, page, limit)
+        if not year.isdigit():
+            return jsonify({"error": "year must be a number"}), 400
+        query["release_year"] = int(year)
+
+    # Page and total in one aggregation
+    next_cursor = None
+    if cursor is not None:
+        try:
+            movies_cursor, next_cursor, total_count = keyset_facet_paginate(catalog_db.movies_metadata, query, "title", 1, cursor, limit, ID_ONLY)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        movies_cursor, total_count = facet_paginate(
+            catalog_db.movies_metadata, query, [("title", 1), ("_id", 1)], (page - 1) * limit, limit, ID_ONLY
+        )
 
-    movies = []
-    for movie in movies_cursor:
-        movie["_id"] = str(movie["_id"])
-        movie_id = movie.get("id")
-        poster = get_signed_url(f"posters/{movie_id}.jpg")
-        movie["poster_url"] = poster["signed_url"]
-        movies.append(movie)
+    movies = movie_cache.ordered([movie["id"] for movie in movies_cursor], projection)
+    attach_poster_urls(movies)
 
-    return jsonify({
+    response = {
         "page": page,
         "total_pages": math.ceil(total_count / limit),
         "total_movies": total_count,
         "movies": movies
-    }), 200
+    }
+    if cursor is not None:
+        response["next_cursor"] = next_cursor
+    return jsonify(response), 200
 
 @watchlist_bp.route("/remove", methods=["DELETE"])
 @require_auth
@@ -115,6 +136,7 @@ def remove_from_watchlist():
         {"user_id": user_id},
         {"$pull": {"movie_ids": movie_id}}
     )
+    invalidate_user_context(user_id)
 
     if result.modified_count == 0:
         return jsonify({"message": "Movie was not in the watchlist or already removed"}), 200
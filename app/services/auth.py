@@ -1,28 +1,172 @@
+from collections import OrderedDict
 from functools import wraps
+import hashlib
 import os
+import threading
+import time
 from flask import request, jsonify, g
-import requests
-from jose import jwt, JWTError
-
-def verify_token(token):
-    CLERK_ISSUER = "https://right-adder-40.clerk.accounts.dev"
-    CLERK_JWKS_URL = f"{CLERK_ISSUER}/.well-known/jwks.json"
-    CLERK_AUDIENCE = "https://right-adder-40.clerk.accounts.dev"
-    jwks = requests.get(CLERK_JWKS_URL).json()
+from app.extensions import extension
+from app.services.metrics import record_jwks_fetch, timed
+
+CLERK_ISSUER = os.getenv("CLERK_ISSUER", "https://right-adder-40.clerk.accounts.dev")
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", f"{CLERK_ISSUER}/.well-known/jwks.json")
+CLERK_AUDIENCE = os.getenv("CLERK_AUDIENCE", CLERK_ISSUER)
+
+
+class JWKSKeyStore:
+    # Store of parsed RSA keys by kid, one per app. Keys are refreshed in a
+    # background thread every `ttl` seconds; an unknown kid triggers at most one
+    # refetch per `miss_cooldown` seconds. A failed fetch keeps the last good set.
+    def __init__(self, url, ttl=300, miss_cooldown=30, timeout=5):
+        self.url = url
+        self.ttl = ttl
+        self.miss_cooldown = miss_cooldown
+        self.timeout = timeout
+        self._keys = {}
+        self._last_miss_refresh = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid = None
+
+    def fetch_jwks(self):
+        import requests
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def refresh(self):
+        from jose import jwk
+        from jose.exceptions import JWKError
+        try:
+            with timed("jwks"):
+                jwks = self.fetch_jwks()
+        except Exception as e:
+            record_jwks_fetch("error")
+            print("JWKS refresh failed, keeping last good key set:", e)
+            return False
+        record_jwks_fetch("ok")
+
+        keys = {}
+        for key in jwks.get("keys", []):
+            if key.get("kty") != "RSA" or not key.get("kid"):
+                continue
+            try:
+                keys[key["kid"]] = jwk.construct(key, "RS256")
+            except JWKError as e:
+                print("Skipping unusable JWKS key", key.get("kid"), e)
+
+        if not keys:
+            print("JWKS response had no usable keys, keeping last good key set")
+            return False
+
+        self._keys = keys
+        return True
+
+    def get_key(self, kid):
+        self._ensure_started()
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: the signing key may have rotated, refetch once per cooldown
+        with self._refresh_lock:
+            key = self._keys.get(kid)
+            now = time.monotonic()
+            if key is None and now - self._last_miss_refresh >= self.miss_cooldown:
+                self._last_miss_refresh = now
+                self.refresh()
+                key = self._keys.get(kid)
+        return key
+
+    def start(self):
+        self._ensure_started()
+
+    def stop(self):
+        self._stop.set()
+
+    def _ensure_started(self):
+        # Background threads do not survive fork, so restart per process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            with self._refresh_lock:
+                self.refresh()
+            thread = threading.Thread(target=self._refresh_loop, args=(self._stop,), daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _refresh_loop(self, stop):
+        while not stop.wait(self.ttl):
+            with self._refresh_lock:
+                self.refresh()
+
+
+class VerifiedTokenCache:
+    # Bounded LRU of verified token payloads, keyed by token hash and kept
+    # only until the token's `exp`.
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token, payload):
+        exp = payload.get("exp")
+        if not exp or self.maxsize <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+jwks_store = extension("jwks_store")
+verified_tokens = extension("verified_tokens")
+
+
+def verify_token(token, key_store=None, token_cache=None):
+    key_store = key_store or jwks_store
+    token_cache = token_cache if token_cache is not None else verified_tokens
+
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    # jose (and the crypto backend under it) is only needed once a token
+    # misses the cache; dev mode never gets here
+    from jose import jwt, JWTError
     try:
         unverified_header = jwt.get_unverified_header(token)
-        rsa_key = None
-        for key in jwks["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"]
-                }
+        rsa_key = key_store.get_key(unverified_header.get("kid"))
         if not rsa_key:
-            raise Exception("Public key not found.")
+            print("JWT verification failed: public key not found")
+            return None
         payload = jwt.decode(
             token,
             rsa_key,
@@ -30,11 +174,13 @@ def verify_token(token):
             audience=CLERK_AUDIENCE,
             issuer=CLERK_ISSUER,
         )
-        return payload
     except JWTError as e:
         print("JWT verification failed:", e)
         return None
 
+    token_cache.put(token, payload)
+    return payload
+
 def require_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -51,11 +197,12 @@ def require_auth(f):
             token = auth_header.split(" ")[1]
         except IndexError:
             return jsonify({"error": "Invalid Authorization header format"}), 401
-        payload = verify_token(token)
+        with timed("auth"):
+            payload = verify_token(token)
         if not payload:
             return jsonify({"error": "Invalid token"}), 401
         g.user_id = payload["sub"]
         g.user_payload = payload
         return f(*args, **kwargs)
-    
-    return decorated 
\ No newline at end of file
+
+    return decorated
@@ -0,0 +1,188 @@
+import ast
+from collections import defaultdict
+import re
+import threading
+import time
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+from app.extensions import catalog_db, extension
+
+
+YEAR_RE = re.compile(r"^\d{4}")
+
+
+def release_year(release_date):
+    if hasattr(release_date, "year"):
+        return release_date.year
+    match = YEAR_RE.match(release_date) if isinstance(release_date, str) else None
+    return int(match.group()) if match else None
+
+
+def parse_genres(genres):
+    # Older imports stored the TMDB genre list as its Python repr
+    if isinstance(genres, str):
+        try:
+            genres = ast.literal_eval(genres)
+        except (ValueError, SyntaxError):
+            return []
+    return [genre for genre in genres or [] if isinstance(genre, dict)]
+
+
+def derived_fields(movie):
+    # Indexable copies of values the watchlist filters used to compute per
+    # query: the release year and the genre ids
+    genre_ids = []
+    for genre in parse_genres(movie.get("genres")):
+        genre_id = genre.get("id")
+        if genre_id is not None and genre_id not in genre_ids:
+            genre_ids.append(genre_id)
+    return {"release_year": release_year(movie.get("release_date")), "genre_ids": genre_ids}
+
+
+def backfill_derived_fields(database=None, batch_size=1000, only_missing=False):
+    database = database if database is not None else catalog_db
+    collection = database.movies_metadata
+    query = {"$or": [{"release_year": {"$exists": False}}, {"genre_ids": {"$exists": False}}]} if only_missing else {}
+    fields = {"release_date": 1, "genres": 1, "release_year": 1, "genre_ids": 1}
+
+    scanned = modified = 0
+    operations = []
+    for movie in collection.find(query, fields).sort("_id", 1).batch_size(batch_size):
+        scanned += 1
+        derived = derived_fields(movie)
+        if all(movie.get(name, ...) == value for name, value in derived.items()):
+            continue
+        operations.append(UpdateOne({"_id": movie["_id"]}, {"$set": derived}))
+        if len(operations) >= batch_size:
+            modified += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        modified += collection.bulk_write(operations, ordered=False).modified_count
+    if modified:
+        genre_index.invalidate()
+        bump_catalog_version(database)
+    return scanned, modified
+
+
+def existing_movie_ids(movie_ids, database=None):
+    # The subset of movie_ids in the catalog: one $in query the id index covers
+    database = database if database is not None else catalog_db
+    return {
+        movie["id"]
+        for movie in database.movies_metadata.find({"id": {"$in": list(movie_ids)}}, {"_id": 0, "id": 1})
+    }
+
+
+class GenreIndex:
+    # Genre name -> ids as they appear in the catalog, so a name filter can be
+    # answered from the indexed genre_ids field. Reloaded every `ttl` seconds.
+    # Genres stored as a repr string are parsed the way derived_fields does,
+    # so every id a name maps to is one genre_ids can hold.
+    def __init__(self, database=None, ttl=3600):
+        self._db = database
+        self.ttl = ttl
+        self._names = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else catalog_db
+
+    def names(self):
+        if self._names is None or time.monotonic() - self._loaded_at >= self.ttl:
+            with self._lock:
+                if self._names is None or time.monotonic() - self._loaded_at >= self.ttl:
+                    names = defaultdict(set)
+                    for row in self.db.movies_metadata.aggregate([
+                        {"$match": {"genres": {"$type": "array"}}},
+                        {"$unwind": "$genres"},
+                        {"$group": {"_id": "$genres.name", "ids": {"$addToSet": "$genres.id"}}},
+                    ]):
+                        if isinstance(row["_id"], str):
+                            names[row["_id"]].update(row["ids"])
+                    # Few distinct repr strings, so they are parsed here
+                    for raw in self.db.movies_metadata.distinct("genres", {"genres": {"$type": "string"}}):
+                        if not isinstance(raw, str):
+                            continue
+                        for genre in parse_genres(raw):
+                            if isinstance(genre.get("name"), str) and genre.get("id") is not None:
+                                names[genre["name"]].add(genre["id"])
+                    self._names = {name: list(ids) for name, ids in names.items()}
+                    self._loaded_at = time.monotonic()
+        return self._names
+
+    def ids_matching(self, pattern):
+        # Same matching the old `genres.name` regex filter did: a
+        # case-insensitive search, falling back to a literal match
+        try:
+            matcher = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            matcher = re.compile(re.escape(pattern), re.IGNORECASE)
+        ids = set()
+        for name, genre_ids in self.names().items():
+            if matcher.search(name):
+                ids.update(genre_ids)
+        return sorted(ids)
+
+    def known_ids(self):
+        return {genre_id for genre_ids in self.names().values() for genre_id in genre_ids}
+
+    def invalidate(self):
+        with self._lock:
+            self._names = None
+
+
+def bump_catalog_version(database=None):
+    # Tell every worker that the catalog changed; returns the new version
+    database = database if database is not None else catalog_db
+    state = database.catalog_state.find_one_and_update(
+        {"_id": "catalog"}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+    return state["version"]
+
+
+class CatalogVersion:
+    # Each worker keeps its own catalog caches, so a reload cannot be pushed
+    # to them. Instead `flask reload-catalog` bumps a counter in
+    # catalog_state and every worker polls it at most every `check_seconds`
+    # (0 turns polling off), running the `on_change` callbacks when it moves.
+    def __init__(self, database=None, check_seconds=10):
+        self._db = database
+        self.check_seconds = check_seconds
+        self.version = None
+        self.callbacks = []
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else catalog_db
+
+    def on_change(self, callback):
+        self.callbacks.append(callback)
+
+    def check(self):
+        if not self.check_seconds:
+            return
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return
+        # One request pays for the read, the rest keep going
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            state = self.db.catalog_state.find_one({"_id": "catalog"})
+            version = state["version"] if state else 0
+            if self.version is not None and version != self.version:
+                print(f"Catalog version {self.version} -> {version}, dropping catalog caches")
+                for callback in self.callbacks:
+                    callback()
+            self.version = version
+        except PyMongoError as e:
+            print("Catalog version check failed:", e)
+        finally:
+            self._lock.release()
+
+
+genre_index = extension("genre_index")
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import os
+import threading
+from app.extensions import extension
+
+
+class FanoutExecutor:
+    # Bounded pool shared by every request of an app; recreated after fork
+    # since worker threads do not survive it
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fanout")
+                    self._pid = os.getpid()
+        return self._executor
+
+
+fanout_executor = extension("fanout_executor")
+
+
+def run_concurrently(*calls):
+    # Run (fn, *args) tuples on the pool and return their results in order.
+    # Each call runs in a copy of the caller's context so flask.g and the
+    # current app are available to it; exceptions are re-raised here.
+    executor = fanout_executor.get()
+    futures = [
+        executor.submit(contextvars.copy_context().run, fn, *args)
+        for fn, *args in calls
+    ]
+    return [future.result() for future in futures]
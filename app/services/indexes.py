@@ -0,0 +1,206 @@
+import statistics
+import time
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.extensions import db
+from app.services.movie import credits_pipeline
+from app.services.user_context import user_documents_pipeline
+from app.utils.helper import facet_pipeline
+
+
+# Fields /movies/list accepts as sort_by; each gets a (field, _id) index so both
+# the page and the cursor pagination modes sort from the index.
+SORT_FIELDS = ["popularity", "vote_average", "vote_count", "release_date", "revenue"]
+
+# user_id must be unique for the atomic upserts in the preference and
+# watchlist routes: two racing first writes would otherwise both insert.
+INDEXES = {
+    "movies_metadata": [
+        IndexModel([("id", ASCENDING)], name="id"),
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title_id"),
+        # Derived by `flask backfill-derived-fields`; used by the watchlist filters
+        IndexModel([("release_year", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)], name="release_year_title_id"),
+        IndexModel([("genre_ids", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)], name="genre_ids_title_id"),
+    ] + [
+        IndexModel([(field, DESCENDING), ("_id", DESCENDING)], name=f"{field}_desc_id")
+        for field in SORT_FIELDS
+    ],
+    "credits": [
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "keywords": [
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "ratings": [
+        IndexModel([("movieId", ASCENDING), ("userId", ASCENDING)], name="movie_user_unique", unique=True),
+        IndexModel([("movieId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="movie_timestamp"),
+    ],
+    "user_details": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "watchlists": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+}
+
+
+def ensure_indexes(database=None, notify=None):
+    # create_indexes is a no-op for indexes that already exist with the same
+    # spec; failures (e.g. duplicates blocking a unique index) are reported
+    # per index instead of stopping the rest. `notify` runs after each one.
+    database = database if database is not None else db
+    results = {}
+    for collection_name, models in INDEXES.items():
+        for model in models:
+            name = model.document["name"]
+            try:
+                database[collection_name].create_indexes([model])
+                results[(collection_name, name)] = "ok"
+            except OperationFailure as e:
+                results[(collection_name, name)] = f"error: {e.details.get('errmsg', e) if e.details else e}"
+            if notify:
+                notify()
+    return results
+
+
+def sample_values(database):
+    movie = database.movies_metadata.find_one({}, {"id": 1, "release_year": 1, "genre_ids": 1}) or {}
+    user = database.user_details.find_one({}, {"user_id": 1}) or {}
+    watchlist = database.watchlists.find_one({"user_id": user.get("user_id")}, {"movie_ids": 1}) or {}
+    return {
+        "movie_id": movie.get("id", "0"),
+        "user_id": user.get("user_id", "unknown"),
+        "watchlist_ids": watchlist.get("movie_ids", [])[:100] or [movie.get("id", "0")],
+        "release_year": movie.get("release_year") or 1999,
+        "genre_ids": (movie.get("genre_ids") or [28])[:1],
+    }
+
+
+def watchlist_pipeline(values, **filters):
+    # The $match + $facet aggregation /watchlist/get sends for a page
+    query = {"id": {"$in": values["watchlist_ids"]}, **filters}
+    return facet_pipeline(query, [("title", 1), ("_id", 1)], 0, 10, {"id": 1})
+
+
+def query_shapes(values):
+    # (label, collection, filter, sort, limit) for every query the routes
+    # issue; aggregations give their pipeline (a list) in place of the filter
+    movie_id = values["movie_id"]
+    shapes = [
+        ("movie by id", "movies_metadata", {"id": movie_id}, None, 1),
+        ("movies by ids", "movies_metadata", {"id": {"$in": values["watchlist_ids"]}}, None, 0),
+        ("watchlist page", "movies_metadata", watchlist_pipeline(values), None, 0),
+        ("watchlist by year", "movies_metadata",
+         watchlist_pipeline(values, release_year=values["release_year"]), None, 0),
+        ("watchlist by genre", "movies_metadata",
+         watchlist_pipeline(values, genre_ids={"$in": values["genre_ids"]}), None, 0),
+        ("credits by ids", "credits", credits_pipeline([movie_id]), None, 0),
+        ("keywords by ids", "keywords", {"id": {"$in": [movie_id]}}, None, 0),
+        ("ratings page", "ratings", {"movieId": movie_id}, [("timestamp", -1), ("_id", -1)], 100),
+        ("rating upsert", "ratings", {"movieId": movie_id, "userId": values["user_id"]}, None, 1),
+        ("user documents", "user_details", user_documents_pipeline(values["user_id"]), None, 0),
+        ("user_details upsert", "user_details", {"user_id": values["user_id"]}, None, 1),
+        ("watchlist upsert", "watchlists", {"user_id": values["user_id"]}, None, 1),
+    ]
+    shapes += [
+        (f"list sort_by {field}", "movies_metadata", {}, [(field, -1), ("_id", -1)], 10)
+        for field in SORT_FIELDS
+    ]
+    return shapes
+
+
+def _plans(explained):
+    # Every query plan in an explain: the find or pushed-down pipeline
+    # itself, a leading $cursor stage, and the pipelines $unionWith runs
+    if "queryPlanner" in explained:
+        yield explained
+    if "$cursor" in explained:
+        yield from _plans(explained["$cursor"])
+    for child in explained.get("stages", []) + explained.get("$unionWith", {}).get("pipeline", []):
+        yield from _plans(child)
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def explain_query(database, collection_name, query, sort=None, limit=0):
+    if isinstance(query, list):
+        command = {"aggregate": collection_name, "pipeline": query, "cursor": {}}
+    else:
+        command = {"find": collection_name, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        if limit:
+            command["limit"] = limit
+    explained = database.command("explain", command, verbosity="executionStats")
+    plans, stats = [], []
+    for part in _plans(explained):
+        winning_plan = part["queryPlanner"].get("winningPlan", {})
+        # Newer servers nest the classic plan under queryPlan
+        plans.append([stage for stage in _stages(winning_plan.get("queryPlan", winning_plan)) if stage])
+        stats.append(part.get("executionStats", {}))
+    stages = [stage for plan in plans for stage in plan]
+
+    def total(key):
+        counts = [part[key] for part in stats if part.get(key) is not None]
+        return sum(counts) if counts else None
+
+    return {
+        "stages": stages,
+        "plan": " + ".join(">".join(plan) for plan in plans),
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": total("totalDocsExamined"),
+        "keys_examined": total("totalKeysExamined"),
+        "returned": total("nReturned"),
+        "millis": total("executionTimeMillis"),
+    }
+
+
+def check_query_shapes(database=None):
+    database = database if database is not None else db
+    values = sample_values(database)
+    return [
+        (label, collection_name, explain_query(database, collection_name, query, sort, limit))
+        for label, collection_name, query, sort, limit in query_shapes(values)
+    ]
+
+
+def query_report(database=None, repeat=20):
+    # Runs each route query `repeat` times and reports client-side latency
+    # with the server's docs/keys examined
+    database = database if database is not None else db
+    values = sample_values(database)
+    report = []
+    for label, collection_name, query, sort, limit in query_shapes(values):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if isinstance(query, list):
+                cursor = database[collection_name].aggregate(query)
+            else:
+                cursor = database[collection_name].find(query)
+                if sort:
+                    cursor = cursor.sort(sort)
+                if limit:
+                    cursor = cursor.limit(limit)
+            list(cursor)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        explained = explain_query(database, collection_name, query, sort, limit)
+        report.append({
+            "query": label,
+            "collection": collection_name,
+            "p50_ms": round(statistics.median(samples), 3),
+            "max_ms": round(samples[-1], 3),
+            "docs_examined": explained["docs_examined"],
+            "keys_examined": explained["keys_examined"],
+            "returned": explained["returned"],
+            "plan": explained["plan"],
+        })
+    return report
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+import pymongo
+from pymongo.errors import PyMongoError
+from app.extensions import catalog_db
+
+
+_draining = threading.Event()
+
+
+def begin_drain():
+    _draining.set()
+
+
+def is_draining():
+    return _draining.is_set()
+
+
+def check_mongo(timeout_seconds):
+    # None when the catalog can be read, else the error. Pinged with the
+    # catalog read preference, so a primary election alone does not take
+    # every worker out of rotation.
+    try:
+        with pymongo.timeout(timeout_seconds):
+            catalog_db.command("ping", read_preference=catalog_db.read_preference)
+    except PyMongoError as e:
+        return str(e)
+    return None
+
+
+def warm_up(app, notify=None):
+    # Run once per worker before it accepts requests. Every step is best
+    # effort: a worker that cannot reach Mongo still starts and reports
+    # unready until it can. `notify` keeps gunicorn from timing the worker
+    # out and is called after every step.
+    from app.services.auth import jwks_store
+    from app.services.catalog import genre_index
+    from app.services.movie_cache import movie_cache
+    from app.services.model_store import get_model
+    from app.services.search import search_index
+
+    settings = app.config["SETTINGS"]
+    notify = notify or (lambda: None)
+    started = time.perf_counter()
+
+    with app.app_context():
+        error = check_mongo(settings.readiness_timeout_ms / 1000)
+        if error:
+            print("Warm-up: Mongo unreachable, skipping index and cache warm-up:", error)
+        else:
+            try:
+                # Record the catalog version before filling the caches
+                app.extensions["catalog_version"].check()
+                if settings.ensure_indexes_on_start:
+                    from app.services.indexes import ensure_indexes
+                    ensure_indexes(notify=notify)
+                genre_index.names()
+                notify()
+                # Catalog-sized, so built in the background; /readyz waits for it
+                search_index.build_in_background()
+                if settings.warmup_movies:
+                    popular = catalog_db.movies_metadata.find({}, {"_id": 0, "id": 1}).sort(
+                        [("popularity", -1), ("_id", -1)]).limit(settings.warmup_movies)
+                    movie_cache.get_many([movie["id"] for movie in popular if "id" in movie])
+                notify()
+            except PyMongoError as e:
+                print("Warm-up: Mongo warm-up failed:", e)
+
+        get_model("recommender")
+        get_model("similar_index")
+        notify()
+        if os.getenv("FLASK_ENV") != "development":
+            jwks_store.start()
+    print(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms (pid {os.getpid()})")
@@ -0,0 +1,278 @@
+from contextlib import contextmanager
+import contextvars
+import threading
+import time
+from pymongo import monitoring
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (bucket_counts, count, total) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    le = _labels(self.labelnames, labels, ("le", f"{bound:g}"))
+                    lines.append(f"{self.name}_bucket{le} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "movieflix_request_duration_seconds", "Request latency by route.", ("method", "route", "status"))
+RESPONSE_BYTES = Histogram(
+    "movieflix_response_size_bytes", "Response body size by route.", ("method", "route"), SIZE_BUCKETS)
+REQUEST_MONGO_COMMANDS = Histogram(
+    "movieflix_request_mongo_commands", "Mongo commands issued per request.", ("method", "route"), COUNT_BUCKETS)
+REQUEST_SIGNED_URLS = Histogram(
+    "movieflix_request_signed_urls", "Signed blob URLs handed out per request.", ("method", "route"), COUNT_BUCKETS)
+MONGO_COMMAND_SECONDS = Histogram(
+    "movieflix_mongo_command_duration_seconds", "Mongo command latency.", ("command", "collection"))
+MONGO_COMMAND_FAILURES = Counter(
+    "movieflix_mongo_command_failures_total", "Failed Mongo commands.", ("command", "collection"))
+SIGNATURES = Counter(
+    "movieflix_signed_urls_total", "Blob URLs requested, by whether a new SAS had to be signed.", ("result",))
+JWKS_FETCHES = Counter(
+    "movieflix_jwks_fetches_total", "JWKS fetches by outcome.", ("outcome",))
+
+# The series are per process, like any Prometheus client: a scrape sees the
+# worker that answered it, whichever app in that process recorded them
+METRICS = [REQUEST_SECONDS, RESPONSE_BYTES, REQUEST_MONGO_COMMANDS, REQUEST_SIGNED_URLS,
+           MONGO_COMMAND_SECONDS, MONGO_COMMAND_FAILURES, SIGNATURES, JWKS_FETCHES]
+
+
+class RequestMetrics:
+    # Per-request tally. Lives in a ContextVar, so work fanned out through
+    # run_concurrently (which copies the context) is counted too.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.queries = {}
+        self.signed_urls = 0
+        self.signatures = 0
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add_command(self, name, collection, seconds):
+        with self._lock:
+            self.mongo_commands += 1
+            self.mongo_seconds += seconds
+            key = f"{name} {collection}" if collection else name
+            count, total = self.queries.get(key, (0, 0.0))
+            self.queries[key] = (count + 1, total + seconds)
+
+    def add_phase(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self, total_seconds):
+        parts = [f"app;dur={total_seconds * 1000:.1f}"]
+        if self.mongo_commands:
+            parts.append(f'mongo;dur={self.mongo_seconds * 1000:.1f};desc="{self.mongo_commands} commands"')
+        for phase, seconds in sorted(self.phases.items()):
+            parts.append(f"{phase};dur={seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def breakdown(self):
+        return ", ".join(
+            f"{key} x{count} {total * 1000:.1f}ms"
+            for key, (count, total) in sorted(self.queries.items(), key=lambda item: -item[1][1])
+        )
+
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase(phase, time.perf_counter() - started)
+
+
+def record_signed_urls(requested, signed):
+    SIGNATURES.inc(("cached",), requested - signed)
+    SIGNATURES.inc(("signed",), signed)
+    metrics = _current.get()
+    if metrics is not None:
+        with metrics._lock:
+            metrics.signed_urls += requested
+            metrics.signatures += signed
+
+
+def record_jwks_fetch(outcome):
+    JWKS_FETCHES.inc((outcome,))
+
+
+def _collection_of(event):
+    value = event.command.get(event.command_name) if hasattr(event, "command") else None
+    return value if isinstance(value, str) else ""
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    # Times every command the client sends. Callbacks run on the thread that
+    # issued the command, so the request's RequestMetrics is still current.
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (_current.get(), _collection_of(event))
+
+    def _finish(self, event):
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), (None, ""))
+
+    def succeeded(self, event):
+        metrics, collection = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_SECONDS.observe((event.command_name, collection), seconds)
+        if metrics is not None:
+            metrics.add_command(event.command_name, collection, seconds)
+
+    def failed(self, event):
+        metrics, collection = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_FAILURES.inc((event.command_name, collection))
+        if metrics is not None:
+            metrics.add_command(event.command_name, collection, seconds)
+
+
+command_listener = CommandMetricsListener()
+
+
+def render_metrics(stats_sources=None):
+    # stats_sources: name -> callable returning a stats dict, rendered as
+    # gauges at scrape time (the app's caches)
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for source, stats in (stats_sources or {}).items():
+        try:
+            values = stats()
+        except Exception as e:
+            print("Skipping metrics source", source, e)
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, (int, float)):
+                name = f"movieflix_{source}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app, server_timing=False, slow_request_ms=1000):
+    from flask import g, request
+
+    def route_of():
+        return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+    @app.before_request
+    def start_request_metrics():
+        metrics = RequestMetrics()
+        g.request_metrics = metrics
+        g.request_metrics_token = _current.set(metrics)
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics = g.pop("request_metrics", None)
+        if metrics is None:
+            return response
+        elapsed = time.perf_counter() - metrics.started
+        route = route_of()
+        REQUEST_SECONDS.observe((request.method, route, str(response.status_code)), elapsed)
+        REQUEST_MONGO_COMMANDS.observe((request.method, route), metrics.mongo_commands)
+        REQUEST_SIGNED_URLS.observe((request.method, route), metrics.signed_urls)
+        # Streamed bodies have no length until they are sent
+        size = None if response.is_streamed else response.calculate_content_length()
+        if size is not None:
+            RESPONSE_BYTES.observe((request.method, route), size)
+
+        if server_timing:
+            response.headers["Server-Timing"] = metrics.server_timing(elapsed)
+        if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+            details = [
+                f"{metrics.mongo_commands} mongo commands ({metrics.mongo_seconds * 1000:.1f}ms) [{metrics.breakdown()}]",
+                f"{metrics.signed_urls} signed urls ({metrics.signatures} new)",
+            ] + [f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in sorted(metrics.phases.items())]
+            print(
+                f"Slow request {request.method} {request.full_path.rstrip('?')} -> {response.status_code} "
+                f"in {elapsed * 1000:.1f}ms: " + ", ".join(details)
+            )
+        return response
+
+    @app.teardown_request
+    def reset_request_metrics(exc):
+        token = g.pop("request_metrics_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+from flask import current_app
+
+
+class ModelStore:
+    # Keeps an offline-built model in memory and reloads it with `loader`
+    # when the file's mtime changes, checked at most every `check_seconds`.
+    # A failed reload keeps serving the previous model.
+    def __init__(self, path, loader, check_seconds=10):
+        self.path = path
+        self.loader = loader
+        self.check_seconds = check_seconds
+        self._model = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self._model is not None and now - self._checked_at < self.check_seconds:
+            return self._model
+        with self._lock:
+            if self._model is not None and now - self._checked_at < self.check_seconds:
+                return self._model
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return self._model
+            if mtime != self._mtime:
+                try:
+                    self._model = self.loader(self.path)
+                    self._mtime = mtime
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Reloading {self.path} failed, keeping the previous model:", e)
+        return self._model
+
+
+# The model modules import numpy/scipy, so they are only imported once there
+# is a model file to load
+def load_recommender(path):
+    from app.services.recommender import RecommenderModel
+    return RecommenderModel.load(path)
+
+
+def load_similar_index(current_path):
+    from app.services.similar import SimilarIndex
+    return SimilarIndex.load_current(current_path)
+
+
+def get_model(name):
+    # The current app's model of that name, or None until one has been built
+    store = current_app.extensions.get(name)
+    return store.get() if store is not None else None
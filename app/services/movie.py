@@ -1,53 +1,129 @@
-import os
-from datetime import datetime, timedelta
-from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
-from app import db
+import re
+from app.extensions import catalog_db
 from flask import jsonify
+from app.services.storage import get_blob_signer, poster_blob, profile_blob
+from app.services.user_context import get_user_context
+from app.services.movie_cache import movie_cache
+
+
+# Named response profiles for movie payloads, mapped to Mongo projections so
+# unused fields are never read, decoded or serialized. None means the whole
+# document.
+CARD_FIELDS = ["id", "title", "genres", "release_date", "vote_average", "vote_count", "popularity"]
+DETAIL_FIELDS = CARD_FIELDS + [
+    "overview", "tagline", "runtime", "original_title", "original_language", "imdb_id",
+    "status", "belongs_to_collection", "budget", "revenue", "homepage",
+]
+MOVIE_PROFILES = {
+    "card": CARD_FIELDS,
+    "detail": DETAIL_FIELDS,
+    "full": None,
+}
+ID_ONLY = {"id": 1}
+FIELD_NAME_RE = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$")
+
+
+def movie_projection(profile=None, fields=None):
+    # `fields` (comma separated) wins over `profile`; the default is the full document
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        invalid = [name for name in names if not FIELD_NAME_RE.match(name)]
+        if invalid:
+            raise ValueError(f"Invalid field names: {', '.join(invalid)}")
+    else:
+        profile = (profile or "full").lower()
+        if profile not in MOVIE_PROFILES:
+            raise ValueError(f"Unknown profile '{profile}', expected one of {', '.join(MOVIE_PROFILES)}")
+        names = MOVIE_PROFILES[profile]
+        if names is None:
+            return None
+
+    projection = {"id": 1}
+    projection.update({name: 1 for name in names})
+    return projection
+
+
+def movie_projection_from_args(args):
+    return movie_projection(args.get("profile"), args.get("fields"))
 
 
 def get_signed_url(filename):
     try:
-        # Azure Blob Storage config
-        connect_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        container_name = "images"
-        blob_name = filename  # file in blob storage
-
-        # Initialize client
-        blob_service_client = BlobServiceClient.from_connection_string(
-            connect_str)
-
-        # Generate SAS token
-        sas_token = generate_blob_sas(
-            account_name=blob_service_client.account_name,
-            container_name=container_name,
-            blob_name=blob_name,
-            account_key=blob_service_client.credential.account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(minutes=15)
-        )
-
-        # Final signed URL
-        blob_url = f"https://{blob_service_client.account_name}.blob.core.windows.net/{container_name}/{blob_name}?{sas_token}"
-
-        return {"signed_url": blob_url}
+        return {"signed_url": get_blob_signer().sign(filename)}
 
     except Exception as e:
         return {"error": str(e)}
 
 
-def get_castdetails(movie_id, user_id):
+def sign_many(blob_names):
+    return get_blob_signer().sign_many(blob_names)
+
+
+def attach_poster_urls(movies):
+    signed = sign_many([poster_blob(movie.get("id")) for movie in movies])
+    for movie in movies:
+        movie["poster_url"] = signed[poster_blob(movie.get("id"))]
+    return movies
+
+
+def attach_profile_urls(people):
+    people = [person for person in people if person.get("id")]
+    signed = sign_many([profile_blob(person["id"]) for person in people])
+    for person in people:
+        person["profile_url"] = signed[profile_blob(person["id"])]
+    return people
+
+
+# Crew jobs shown by default; the rest of the crew never leaves Mongo
+DEFAULT_CREW_JOBS = ["Executive Producer", "Original Music Composer", "Director"]
+
+
+def credits_pipeline(movie_ids, jobs=None, cast_limit=None):
+    jobs = list(jobs) if jobs else DEFAULT_CREW_JOBS
+    return [
+        {"$match": {"id": {"$in": list(movie_ids)}}},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "cast": "$cast" if cast_limit is None else {"$slice": [{"$ifNull": ["$cast", []]}, cast_limit]},
+            "crew": {"$filter": {
+                "input": {"$ifNull": ["$crew", []]},
+                "as": "member",
+                "cond": {"$in": ["$$member.job", jobs]},
+            }},
+        }},
+    ]
+
+
+def get_shaped_credits(movie_ids, jobs=None, cast_limit=None):
+    if not movie_ids:
+        return {}
+    return {
+        credit["id"]: credit
+        for credit in catalog_db.credits.aggregate(credits_pipeline(movie_ids, jobs, cast_limit))
+    }
+
+
+def get_credits(movie_id, jobs=None, cast_limit=None):
+    return get_shaped_credits([movie_id], jobs, cast_limit).get(movie_id)
+
+
+def credit_shaping_from_args(args):
+    jobs = [job.strip() for job in args.get("jobs", "").split(",") if job.strip()] or None
+    cast_limit = args.get("cast_limit")
+    if cast_limit is not None:
+        cast_limit = int(cast_limit)
+        if cast_limit < 0:
+            raise ValueError("cast_limit must be zero or positive")
+    return jobs, cast_limit
+
+
+def castdetails_from_credit(credit, liked_actor_ids):
     try:
-        listofcast = db.credits.find_one(
-            {"id" : movie_id}
-        ) 
         cast = {}
-        cast['cast'] = listofcast['cast'] 
-        user_details = db.user_details.find_one({"user_id": user_id})
-        liked_actor_ids = set(user_details.get("actor_ids", [])) if user_details else set()
-        for c in cast['cast']:
-            if c.get('id'):
-                c['profile_url'] = get_signed_url(f"tmdb_profile_photos/{c['id']}.jpg").get('signed_url')
-                c["is_liked"] = c['id'] in liked_actor_ids
+        cast['cast'] = credit['cast'] 
+        for c in attach_profile_urls(cast['cast']):
+            c["is_liked"] = c['id'] in liked_actor_ids
         return cast
     except TypeError:
         return {"error": "Movie Not Found"}, 404
@@ -55,18 +131,10 @@ def get_castdetails(movie_id, user_id):
         return {"error": str(e)}, 500
 
 
-def get_crewdetails(movie_id):
+def crewdetails_from_credit(credit):
     try:
-        listofcast = db.credits.find_one(
-            {"id": movie_id}
-        )
-        targetjobs = {"Executive Producer", "Original Music Composer", "Director"}
-        crew = [] 
-        for c in listofcast.get('crew', []):
-            job = c.get('job')
-            if job in targetjobs:
-                crew.append(c)
-                c['profile_url'] = get_signed_url(f"tmdb_profile_photos/{c['id']}.jpg").get('signed_url')
+        crew = credit.get('crew', [])
+        attach_profile_urls(crew)
         return crew
     except TypeError:
         return {"error": "Movie Not Found"}, 404
@@ -74,18 +142,34 @@ def get_crewdetails(movie_id):
         return {"error": str(e)}, 500
 
 
+def get_castdetails(movie_id, user_id, cast_limit=None):
+    try:
+        credit = get_credits(movie_id, cast_limit=cast_limit)
+        liked_actor_ids = get_user_context(user_id).liked_actor_ids
+    except Exception as e:
+        return {"error": str(e)}, 500
+    return castdetails_from_credit(credit, liked_actor_ids)
+
+
+def get_crewdetails(movie_id, jobs=None):
+    try:
+        credit = get_credits(movie_id, jobs=jobs)
+    except Exception as e:
+        return {"error": str(e)}, 500
+    return crewdetails_from_credit(credit)
 
-def fetch_movies(movie_ids):
+
+
+def fetch_movies(movie_ids, projection=None):
     if not movie_ids:
         return []
-    movies_cursor = db.movies_metadata.find({"id": {"$in": movie_ids}})
-    movies = []
-    for movie in movies_cursor:
-        movie["_id"] = str(movie["_id"])
-        movie_id = movie.get("id")
-        poster = get_signed_url(f"posters/{movie_id}.jpg")
-        movie["poster_url"] = poster["signed_url"]
-        movies.append(movie)
-    return movies
+    return attach_poster_urls(movie_cache.ordered(movie_ids, projection))
 
 
+def iter_movies(movie_ids, projection=None, batch_size=100):
+    # Yields movies one batch of ids at a time, hydrating each batch through the
+    # catalog cache and signing its posters, so memory stays flat however many
+    # ids there are
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_cache.ordered(movie_ids[start:start + batch_size], projection)
+        yield from attach_poster_urls(batch)
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import threading
+import time
+import bson
+from app.extensions import catalog_db, extension
+
+
+def projection_key(projection):
+    return tuple(sorted(projection.items())) if projection else None
+
+
+class MovieCache:
+    # Read-through LRU/TTL cache of catalog documents keyed by movie `id` and
+    # projection: a card lookup only ever reads, stores and decodes the card
+    # fields. Documents are stored as BSON bytes, so the byte budget is exact
+    # and every hit decodes a fresh copy that callers are free to mutate.
+    def __init__(self, collection_name="movies_metadata", max_bytes=64 * 1024 * 1024, ttl=600, database=None):
+        self.collection_name = collection_name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._db = database
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def collection(self):
+        return (self._db if self._db is not None else catalog_db)[self.collection_name]
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, data = entry
+        if expires <= now:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def _drop(self, key):
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def _store(self, key, data, now):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (now + self.ttl, data)
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def get_many(self, movie_ids, projection=None):
+        # Returns {id: document} for the ids that exist; misses are fetched
+        # with a single $in query using the same projection
+        now = time.monotonic()
+        shape = projection_key(projection)
+        found = {}
+        missing = []
+        with self._lock:
+            for movie_id in dict.fromkeys(movie_ids):
+                data = self._lookup((movie_id, shape), now)
+                if data is None:
+                    missing.append(movie_id)
+                else:
+                    found[movie_id] = data
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        documents = {movie_id: bson.decode(data) for movie_id, data in found.items()}
+        if missing:
+            # `id` is what the entries are keyed by, so it is always read
+            fetch_projection = dict(projection, id=1) if projection else None
+            fetched = [
+                (document["id"], bson.encode(document), document)
+                for document in self.collection.find({"id": {"$in": missing}}, fetch_projection)
+            ]
+            with self._lock:
+                for movie_id, data, _ in fetched:
+                    self._store((movie_id, shape), data, now)
+            for movie_id, _, document in fetched:
+                documents[movie_id] = document
+        return documents
+
+    def get(self, movie_id, projection=None):
+        return self.get_many([movie_id], projection).get(movie_id)
+
+    def ordered(self, movie_ids, projection=None):
+        # Documents in the order of `movie_ids`, skipping unknown ids
+        documents = self.get_many(movie_ids, projection)
+        return [documents[movie_id] for movie_id in dict.fromkeys(movie_ids) if movie_id in documents]
+
+    def invalidate(self, movie_ids=None):
+        # Drop every projection of the given ids, or everything (e.g. after a
+        # catalog reload)
+        with self._lock:
+            if movie_ids is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            movie_ids = set(movie_ids)
+            for key in [key for key in self._entries if key[0] in movie_ids]:
+                self._drop(key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+movie_cache = extension("movie_cache")
@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import timezone
+from typing import Optional
+from app.extensions import extension
+
+
+# Same widths TMDB serves, so clients can ask for familiar sizes
+THUMBNAIL_WIDTHS = {92, 154, 185, 342, 500, 780}
+
+SAFE_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+@dataclass
+class Poster:
+    source: object  # path on disk, or a GridOut when the disk cache is off
+    content_type: str
+    etag: str
+    last_modified: float
+    # Bytes in a GridOut source; send_file can only size paths and BytesIO
+    length: Optional[int] = None
+
+
+def _cache_key(movie_id, width):
+    name = movie_id if SAFE_NAME_RE.match(movie_id) else hashlib.sha1(movie_id.encode("utf-8")).hexdigest()
+    return f"{name}_w{width}" if width else name
+
+
+def _file_etag(grid_out):
+    # GridFS md5 is optional on newer drivers; _id + length still changes on re-upload
+    return grid_out.md5 or f"{grid_out._id}-{grid_out.length}"
+
+
+def _last_modified(grid_out):
+    upload_date = grid_out.upload_date
+    if upload_date is None:
+        return time.time()
+    if upload_date.tzinfo is None:
+        upload_date = upload_date.replace(tzinfo=timezone.utc)
+    return upload_date.timestamp()
+
+
+def thumbnails_available():
+    # Resizing needs Pillow; the route answers 501 for ?w= without it
+    return importlib.util.find_spec("PIL") is not None
+
+
+def resize_image(data, width):
+    # (None, None) when the image cannot be resized
+    try:
+        from PIL import Image
+    except ImportError:
+        return None, None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= width:
+                return data, Image.MIME.get(image.format)
+            height = max(1, round(image.height * width / image.width))
+            resized = image.convert("RGB").resize((width, height), Image.LANCZOS)
+            output = io.BytesIO()
+            resized.save(output, format="JPEG", quality=85, optimize=True)
+            return output.getvalue(), "image/jpeg"
+    except OSError as e:
+        print(f"Could not resize poster to {width}px:", e)
+        return None, None
+
+
+class PosterCache:
+    # On-disk cache of posters and resized variants. A fresh entry is served
+    # from disk without touching GridFS; each entry has a small JSON sidecar
+    # with its ETag, Last-Modified and content type.
+    def __init__(self, directory=None, ttl=24 * 60 * 60, max_files=5000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_files = max_files
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".img", base + ".json"
+
+    def get(self, key):
+        image_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        if meta.get("fetched_at", 0) + self.ttl < time.time() or not os.path.exists(image_path):
+            return None
+        return Poster(image_path, meta["content_type"], meta["etag"], meta["last_modified"])
+
+    def put(self, key, data, content_type, etag, last_modified):
+        os.makedirs(self.directory, exist_ok=True)
+        image_path, meta_path = self._paths(key)
+        meta = {
+            "content_type": content_type,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        # Write to temp files and rename so readers never see partial files
+        for path, payload, mode in ((image_path, data, "wb"), (meta_path, json.dumps(meta), "w")):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, mode) as tmp_file:
+                tmp_file.write(payload)
+            os.replace(tmp_path, path)
+        self._evict()
+        return Poster(image_path, content_type, etag, last_modified)
+
+    def _evict(self):
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".img")]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            for path in (entry.path, entry.path[:-4] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+poster_cache = extension("poster_cache")
+
+
+def get_poster(database, movie_id, width=None):
+    movie_id = str(movie_id)
+    key = _cache_key(movie_id, width)
+    if poster_cache.enabled:
+        poster = poster_cache.get(key)
+        if poster is not None:
+            return poster
+
+    from gridfs import GridFS
+    grid_out = GridFS(database).find_one({"filename": movie_id})
+    if not grid_out:
+        return None
+
+    content_type = grid_out.content_type or "image/jpeg"
+    etag = _file_etag(grid_out)
+    last_modified = _last_modified(grid_out)
+    if not poster_cache.enabled and not width:
+        return Poster(grid_out, content_type, etag, last_modified, grid_out.length)
+
+    data = grid_out.read()
+    if width:
+        resized, resized_type = resize_image(data, width)
+        if resized is None:
+            # Serve the original, but never cache it as the resized variant
+            return Poster(io.BytesIO(data), content_type, etag, last_modified)
+        data, content_type = resized, resized_type or content_type
+        etag = f"{etag}-w{width}"
+
+    if not poster_cache.enabled:
+        return Poster(io.BytesIO(data), content_type, etag, last_modified)
+    return poster_cache.put(key, data, content_type, etag, last_modified)
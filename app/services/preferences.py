@@ -0,0 +1,134 @@
+from pymongo import ReturnDocument
+from app.extensions import db
+
+
+CREATED = "created"
+ADDED = "added"
+EXISTS = "exists"
+
+
+def add_to_set(collection, user_id, field, value):
+    # One atomic upsert: creates the user document, adds the value, or does nothing
+    result = collection.update_one(
+        {"user_id": user_id},
+        {"$addToSet": {field: value}},
+        upsert=True
+    )
+    if result.upserted_id is not None:
+        return CREATED
+    return ADDED if result.modified_count else EXISTS
+
+
+def push_movie_entry(user_id, entry, collection=None):
+    # Entries are {"movie_id", "preference"} dicts, so $addToSet would accept a
+    # second entry for the same movie with another preference. Push only when
+    # the movie is absent; that check and the push are a single atomic update.
+    collection = collection if collection is not None else db.user_details
+    for _ in range(2):
+        result = collection.update_one(
+            {"user_id": user_id, "movie_ids.movie_id": {"$ne": entry["movie_id"]}},
+            {"$push": {"movie_ids": entry}}
+        )
+        if result.modified_count:
+            return ADDED
+
+        # No match: either the movie is already there or the user has no
+        # document yet. Create it without touching an existing one.
+        result = collection.update_one(
+            {"user_id": user_id},
+            {"$setOnInsert": {"movie_ids": [entry]}},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            return CREATED
+        # The document exists; loop once in case it was created concurrently
+        # between the two updates without this movie in it.
+    return EXISTS
+
+
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+
+
+def parse_movie_id(raw):
+    if isinstance(raw, bool) or not isinstance(raw, (str, int)) or not str(raw).strip():
+        raise ValueError("movie id must be a non-empty string or integer")
+    return str(raw).strip()
+
+
+def parse_int_id(raw):
+    if isinstance(raw, bool) or not isinstance(raw, (str, int)):
+        raise ValueError("id must be an integer")
+    return int(raw)
+
+
+def screen_ids(raw_ids, parse, lookup=None):
+    # [(raw, id, status)] in request order. status is INVALID when `parse`
+    # rejects the value, DUPLICATE for a repeat, NOT_FOUND when `lookup`
+    # (called once with every candidate id, returning the known ones) lacks
+    # it, and None for ids that should be written.
+    screened, seen = [], set()
+    for raw in raw_ids:
+        try:
+            value = parse(raw)
+        except (TypeError, ValueError):
+            screened.append((raw, None, INVALID))
+            continue
+        screened.append((raw, value, DUPLICATE if value in seen else None))
+        seen.add(value)
+    if lookup is not None and seen:
+        known = lookup(list(seen))
+        screened = [
+            (raw, value, NOT_FOUND if status is None and value not in known else status)
+            for raw, value, status in screened
+        ]
+    return screened
+
+
+def add_many_to_sets(collection, user_id, values_by_field, projection=None):
+    # Every value in one atomic upsert ($addToSet with $each per field).
+    # Returns the document as it was before, so callers can tell which values
+    # were new; {} when it was created.
+    additions = {field: {"$each": values} for field, values in values_by_field.items() if values}
+    update = {"$addToSet": additions} if additions else {"$setOnInsert": {"user_id": user_id}}
+    before = collection.find_one_and_update(
+        {"user_id": user_id},
+        update,
+        projection=projection or {field: 1 for field in values_by_field},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    return before or {}
+
+
+def push_movie_entries(user_id, entries, collection=None):
+    # Bulk push_movie_entry for a user document that exists. One $push/$each
+    # guarded by $nin adds them all at once; if another request added one of
+    # the movies in the meantime nothing is pushed, so drop the ones now
+    # present and retry. Returns the movie ids that were added.
+    collection = collection if collection is not None else db.user_details
+    remaining = list(entries)
+    while remaining:
+        movie_ids = [entry["movie_id"] for entry in remaining]
+        result = collection.update_one(
+            {"user_id": user_id, "movie_ids.movie_id": {"$nin": movie_ids}},
+            {"$push": {"movie_ids": {"$each": remaining}}}
+        )
+        if result.modified_count:
+            return set(movie_ids)
+        document = collection.find_one({"user_id": user_id}, {"movie_ids.movie_id": 1}) or {}
+        present = {entry.get("movie_id") for entry in document.get("movie_ids", [])}
+        still_missing = [entry for entry in remaining if entry["movie_id"] not in present]
+        if len(still_missing) == len(remaining):
+            break
+        remaining = still_missing
+    return set()
+
+
+def screened_results(screened, key, added):
+    # Per-item response entries for screen_ids output once the write is done
+    return [
+        {key: raw if value is None else value, "status": status or (ADDED if value in added else EXISTS)}
+        for raw, value, status in screened
+    ]
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+from app.extensions import db
+
+
+def star_bucket(rating):
+    # Half-star bucket ("9" for 4.5); Mongo field names cannot contain "."
+    return str(int(round(float(rating) * 2)))
+
+
+def format_stats(stats):
+    stats = stats or {}
+    count = stats.get("count", 0)
+    total = stats.get("sum", 0)
+    histogram = {
+        f"{int(bucket) / 2:g}": n
+        for bucket, n in sorted((stats.get("histogram") or {}).items(), key=lambda item: int(item[0]))
+        if n
+    }
+    return {
+        "count": count,
+        "sum": total,
+        "mean": round(total / count, 2) if count else 0,
+        "histogram": histogram,
+    }
+
+
+def get_rating_stats(movie_id):
+    return format_stats(db.rating_stats.find_one({"_id": movie_id}))
+
+
+def record_rating(movie_id, user_id, rating, timestamp=None):
+    rating = float(rating)
+    timestamp = timestamp or int(datetime.now(timezone.utc).timestamp())
+    previous = db.ratings.find_one_and_update(
+        {"movieId": movie_id, "userId": user_id},
+        {"$set": {"rating": rating, "timestamp": timestamp}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if previous is None:
+        inc = {"count": 1, "sum": rating, f"histogram.{star_bucket(rating)}": 1}
+    else:
+        old_rating = float(previous["rating"])
+        inc = {"sum": rating - old_rating}
+        if star_bucket(old_rating) != star_bucket(rating):
+            inc[f"histogram.{star_bucket(old_rating)}"] = -1
+            inc[f"histogram.{star_bucket(rating)}"] = 1
+    db.rating_stats.update_one({"_id": movie_id}, {"$inc": inc}, upsert=True)
+    return previous is None
+
+
+def get_ratings_page(movie_id, page=1, limit=100):
+    cursor = db.ratings.find(
+        {"movieId": movie_id},
+        {"_id": 0, "userId": 1, "rating": 1, "timestamp": 1},
+    ).sort([("timestamp", -1), ("_id", -1)]).skip((page - 1) * limit).limit(limit)
+    return list(cursor)
+
+
+def rebuild_rating_stats(movie_ids=None):
+    pipeline = []
+    if movie_ids:
+        pipeline.append({"$match": {"movieId": {"$in": list(movie_ids)}}})
+    pipeline += [
+        {"$group": {
+            "_id": {
+                "movieId": "$movieId",
+                "bucket": {"$toString": {"$toInt": {"$round": [{"$multiply": ["$rating", 2]}, 0]}}},
+            },
+            "n": {"$sum": 1},
+            "sum": {"$sum": "$rating"},
+        }},
+        {"$group": {
+            "_id": "$_id.movieId",
+            "count": {"$sum": "$n"},
+            "sum": {"$sum": "$sum"},
+            "histogram": {"$push": {"k": "$_id.bucket", "v": "$n"}},
+        }},
+        {"$set": {"histogram": {"$arrayToObject": "$histogram"}}},
+        {"$merge": {"into": "rating_stats", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    db.ratings.aggregate(pipeline, allowDiskUse=True)
+    return db.rating_stats.estimated_document_count()
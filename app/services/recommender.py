@@ -0,0 +1,205 @@
+import os
+import time
+import numpy as np
+from scipy import sparse
+from app.extensions import catalog_db, db
+
+
+CAST_PER_MOVIE = 15
+GENRE_WEIGHT = 1.0
+CAST_WEIGHT = 0.6
+PRIOR_WEIGHT = 0.35
+DISLIKE_WEIGHT = 0.5
+EXPLICIT_WEIGHT = 2.0
+# Bayesian average: a movie's mean rating is pulled towards the catalog mean
+# as if it had this many extra ratings at that mean
+PRIOR_RATINGS = 25
+MODEL_VERSION = 1
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def _scale(values):
+    values = np.asarray(values, dtype=np.float64)
+    spread = values.max() - values.min() if values.size else 0
+    return (values - values.min()) / spread if spread else np.zeros_like(values)
+
+
+def _feature_matrix(rows, columns, weights, shape):
+    matrix = sparse.csr_matrix((weights, (rows, columns)), shape=shape, dtype=np.float32)
+    matrix.sum_duplicates()
+    return _normalize_rows(matrix).tocsr().astype(np.float32)
+
+
+def build_model(database=None):
+    # movie x genre and movie x cast matrices (rows L2-normalized) plus a
+    # popularity prior per movie, built from movies_metadata, credits and
+    # rating_stats
+    catalog = database if database is not None else catalog_db
+    users = database if database is not None else db
+
+    movie_ids, vote_prior = [], []
+    genre_cols, genre_rows = [], []
+    genre_index = {}
+    for movie in catalog.movies_metadata.find({}, {"id": 1, "genre_ids": 1, "genres.id": 1,
+                                                   "vote_average": 1, "vote_count": 1}):
+        movie_id = movie.get("id")
+        if movie_id is None:
+            continue
+        row = len(movie_ids)
+        movie_ids.append(str(movie_id))
+        genre_ids = movie.get("genre_ids")
+        if genre_ids is None:
+            genre_ids = [genre.get("id") for genre in movie.get("genres") or [] if isinstance(genre, dict)]
+        for genre_id in genre_ids:
+            if genre_id is None:
+                continue
+            genre_rows.append(row)
+            genre_cols.append(genre_index.setdefault(genre_id, len(genre_index)))
+        try:
+            vote_prior.append(float(movie.get("vote_average") or 0) * np.log1p(float(movie.get("vote_count") or 0)))
+        except (TypeError, ValueError):
+            vote_prior.append(0.0)
+
+    rows_by_id = {movie_id: row for row, movie_id in enumerate(movie_ids)}
+    cast_rows, cast_cols, cast_weights = [], [], []
+    actor_index = {}
+    for credit in catalog.credits.aggregate([
+        {"$project": {"_id": 0, "id": 1, "cast": {"$map": {
+            "input": {"$slice": [{"$ifNull": ["$cast", []]}, CAST_PER_MOVIE]},
+            "as": "member",
+            "in": "$$member.id",
+        }}}},
+    ]):
+        row = rows_by_id.get(str(credit.get("id")))
+        if row is None:
+            continue
+        for order, actor_id in enumerate(credit.get("cast") or []):
+            if actor_id is None:
+                continue
+            cast_rows.append(row)
+            cast_cols.append(actor_index.setdefault(actor_id, len(actor_index)))
+            # Leads count for more than the end of the billing
+            cast_weights.append(1.0 / np.sqrt(order + 1))
+
+    counts = np.zeros(len(movie_ids))
+    sums = np.zeros(len(movie_ids))
+    for stats in users.rating_stats.find({}, {"count": 1, "sum": 1}):
+        row = rows_by_id.get(str(stats["_id"]))
+        if row is not None:
+            counts[row] = stats.get("count", 0)
+            sums[row] = stats.get("sum", 0)
+    if counts.sum():
+        catalog_mean = sums.sum() / counts.sum()
+        bayes_mean = (PRIOR_RATINGS * catalog_mean + sums) / (PRIOR_RATINGS + counts)
+        prior = _scale(bayes_mean * np.log1p(counts))
+    else:
+        prior = _scale(vote_prior)
+
+    shape = len(movie_ids)
+    return RecommenderModel(
+        movie_ids=np.array(movie_ids, dtype=object),
+        genre_ids=np.array(list(genre_index), dtype=object),
+        actor_ids=np.array(list(actor_index), dtype=object),
+        genres=_feature_matrix(genre_rows, genre_cols, np.ones(len(genre_rows)), (shape, len(genre_index))),
+        cast=_feature_matrix(cast_rows, cast_cols, cast_weights, (shape, len(actor_index))),
+        prior=prior.astype(np.float32),
+        built_at=time.time(),
+    )
+
+
+class RecommenderModel:
+    def __init__(self, movie_ids, genre_ids, actor_ids, genres, cast, prior, built_at):
+        self.movie_ids = movie_ids
+        self.genre_ids = genre_ids
+        self.actor_ids = actor_ids
+        self.genres = genres
+        self.cast = cast
+        self.prior = prior
+        self.built_at = built_at
+        # Transposes are what the user profiles are built with
+        self.genres_t = genres.T.tocsr()
+        self.cast_t = cast.T.tocsr()
+        self.movie_rows = {movie_id: row for row, movie_id in enumerate(movie_ids.tolist())}
+        self.genre_cols = {genre_id: col for col, genre_id in enumerate(genre_ids.tolist())}
+        self.actor_cols = {actor_id: col for col, actor_id in enumerate(actor_ids.tolist())}
+
+    def save(self, path):
+        # Written next to the target and renamed so a reloading worker never
+        # sees a half-written file
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(MODEL_VERSION),
+                built_at=np.array(self.built_at),
+                movie_ids=self.movie_ids.astype(str),
+                genre_ids=np.array(self.genre_ids.tolist()),
+                actor_ids=np.array(self.actor_ids.tolist()),
+                prior=self.prior,
+                **{f"genres_{part}": getattr(self.genres, part) for part in ("data", "indices", "indptr")},
+                **{f"cast_{part}": getattr(self.cast, part) for part in ("data", "indices", "indptr")},
+                genres_shape=np.array(self.genres.shape),
+                cast_shape=np.array(self.cast.shape),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != MODEL_VERSION:
+                raise ValueError(f"Unsupported recommender model version {int(data['version'])}")
+
+            def matrix(name):
+                return sparse.csr_matrix(
+                    (data[f"{name}_data"], data[f"{name}_indices"], data[f"{name}_indptr"]),
+                    shape=tuple(data[f"{name}_shape"]),
+                )
+
+            return cls(
+                movie_ids=data["movie_ids"].astype(object),
+                genre_ids=data["genre_ids"].astype(object),
+                actor_ids=data["actor_ids"].astype(object),
+                genres=matrix("genres"),
+                cast=matrix("cast"),
+                prior=data["prior"],
+                built_at=float(data["built_at"]),
+            )
+
+    def _profile(self, matrix_t, liked_rows, disliked_rows, explicit_cols):
+        # Sum of the liked movies' feature rows minus a share of the disliked
+        # ones, plus the explicitly liked genres/actors: one sparse mat-vec
+        weights = np.zeros(matrix_t.shape[1], dtype=np.float32)
+        weights[liked_rows] = 1.0
+        weights[disliked_rows] = -DISLIKE_WEIGHT
+        profile = matrix_t @ weights
+        profile[explicit_cols] += EXPLICIT_WEIGHT
+        norm = np.linalg.norm(profile)
+        return profile / norm if norm else profile
+
+    def recommend(self, liked_movie_ids=(), disliked_movie_ids=(), liked_genre_ids=(), liked_actor_ids=(),
+                  exclude_ids=(), limit=20):
+        liked_rows = [self.movie_rows[m] for m in map(str, liked_movie_ids) if m in self.movie_rows]
+        disliked_rows = [self.movie_rows[m] for m in map(str, disliked_movie_ids) if m in self.movie_rows]
+        genre_cols = [self.genre_cols[g] for g in liked_genre_ids if g in self.genre_cols]
+        actor_cols = [self.actor_cols[a] for a in liked_actor_ids if a in self.actor_cols]
+
+        scores = PRIOR_WEIGHT * self.prior.astype(np.float32)
+        if liked_rows or disliked_rows or genre_cols:
+            scores += GENRE_WEIGHT * (self.genres @ self._profile(self.genres_t, liked_rows, disliked_rows, genre_cols))
+        if liked_rows or disliked_rows or actor_cols:
+            scores += CAST_WEIGHT * (self.cast @ self._profile(self.cast_t, liked_rows, disliked_rows, actor_cols))
+
+        excluded = [self.movie_rows[m] for m in map(str, exclude_ids) if m in self.movie_rows]
+        scores[excluded] = -np.inf
+        limit = min(limit, len(scores) - len(set(excluded)))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.movie_ids[row], float(scores[row])) for row in top]
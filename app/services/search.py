@@ -0,0 +1,283 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+import re
+import threading
+import time
+from app.extensions import catalog_db, extension
+
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+TITLE_WEIGHT = 3.0
+KEYWORD_WEIGHT = 1.0
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+FUZZY_MIN_SIMILARITY = 0.45
+MAX_PREFIX_EXPANSIONS = 50
+
+INDEX_STATE = (
+    "postings", "terms", "trigram_terms", "titles", "popularity",
+    "last_movie_oid", "last_keywords_oid", "refreshed_at",
+)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance (adjacent transpositions count once),
+    # giving up as soon as it exceeds `limit`
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def trigrams(term):
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    # In-process inverted index over movie titles and keywords.
+    #
+    # Query tokens match index terms exactly, by prefix, or (when neither
+    # matches) by trigram similarity or a small edit distance to tolerate typos. Every query token has to
+    # match for a movie to be returned; results are ranked by score and then by
+    # popularity. The index is built on first use and then refreshed
+    # incrementally with documents whose _id is newer than the last one seen.
+    # That only picks up inserts, so edits and deletes wait for the full
+    # rebuild every `rebuild_seconds` (0 turns it off) or the one a
+    # `flask reload-catalog` asks for. Rebuilds run in a background thread
+    # while the old index keeps answering.
+    def __init__(self, database=None, refresh_seconds=300, rebuild_seconds=0):
+        self._db = database
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.rebuilt_at = None
+        self._rebuild_requested = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.trigram_terms = defaultdict(set)
+        self.titles = {}
+        self.popularity = {}
+        self.last_movie_oid = None
+        self.last_keywords_oid = None
+        self.refreshed_at = None
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else catalog_db
+
+    def _add_term(self, term, movie_id, weight):
+        postings = self.postings.get(term)
+        if postings is None:
+            postings = self.postings[term] = {}
+            # Kept sorted by _load, which sorts once after adding a batch
+            self.terms.append(term)
+            for gram in trigrams(term):
+                self.trigram_terms[gram].add(term)
+        postings[movie_id] = max(postings.get(movie_id, 0.0), weight)
+
+    def add_movie(self, movie):
+        movie_id = movie.get("id")
+        if movie_id is None:
+            return
+        title = movie.get("title") or ""
+        self.titles[movie_id] = " ".join(tokenize(title))
+        try:
+            self.popularity[movie_id] = float(movie.get("popularity") or 0)
+        except (TypeError, ValueError):
+            self.popularity[movie_id] = 0.0
+        for term in tokenize(title):
+            self._add_term(term, movie_id, TITLE_WEIGHT)
+
+    def add_keywords(self, keywords_doc):
+        movie_id = keywords_doc.get("id")
+        if movie_id is None:
+            return
+        for keyword in keywords_doc.get("keywords") or []:
+            for term in tokenize(keyword.get("name")):
+                self._add_term(term, movie_id, KEYWORD_WEIGHT)
+
+    def _load(self):
+        movie_query = {"_id": {"$gt": self.last_movie_oid}} if self.last_movie_oid else {}
+        movies = self.db.movies_metadata.find(
+            movie_query, {"id": 1, "title": 1, "popularity": 1}
+        ).sort("_id", 1)
+        keyword_query = {"_id": {"$gt": self.last_keywords_oid}} if self.last_keywords_oid else {}
+        keywords = self.db.keywords.find(keyword_query, {"id": 1, "keywords.name": 1}).sort("_id", 1)
+
+        movies = list(movies)
+        keywords = list(keywords)
+        with self._lock:
+            for movie in movies:
+                self.add_movie(movie)
+                self.last_movie_oid = movie["_id"]
+            for keywords_doc in keywords:
+                self.add_keywords(keywords_doc)
+                self.last_keywords_oid = keywords_doc["_id"]
+            self.terms.sort()
+            self.refreshed_at = time.monotonic()
+
+    def _rebuild(self, database):
+        fresh = SearchIndex(database, self.refresh_seconds)
+        fresh._load()
+        with self._lock:
+            for name in INDEX_STATE:
+                setattr(self, name, getattr(fresh, name))
+        self.rebuilt_at = time.monotonic()
+
+    def rebuild(self):
+        with self._build_lock:
+            self._rebuild(self.db)
+
+    def request_rebuild(self):
+        # Picked up by the next ensure_fresh
+        self._rebuild_requested = True
+
+    def _rebuild_in_background(self, database):
+        try:
+            self._rebuild(database)
+        except Exception as e:
+            print("Search index rebuild failed, keeping the current index:", e)
+        finally:
+            self._build_lock.release()
+
+    def _start_rebuild(self, name):
+        # Called holding _build_lock, which the thread releases. The thread
+        # has no app context, so it gets the database itself.
+        database = self._db if self._db is not None else catalog_db._get_current_object()
+        threading.Thread(target=self._rebuild_in_background, args=(database,), name=name, daemon=True).start()
+
+    @property
+    def ready(self):
+        return self.refreshed_at is not None
+
+    def build_in_background(self):
+        # The first build, off the request path: worker warm-up starts it and
+        # /readyz reports unready until it is done. A no-op once built or
+        # while another build runs.
+        if self.ready or not self._build_lock.acquire(blocking=False):
+            return
+        self._start_rebuild("search-build")
+
+    def ensure_fresh(self):
+        if self.refreshed_at is None:
+            with self._build_lock:
+                if self.refreshed_at is None:
+                    self._load()
+                    self.rebuilt_at = time.monotonic()
+            return
+        now = time.monotonic()
+        rebuild_due = self.rebuild_seconds and now - self.rebuilt_at >= self.rebuild_seconds
+        if (self._rebuild_requested or rebuild_due) and self._build_lock.acquire(blocking=False):
+            self._rebuild_requested = False
+            self._start_rebuild("search-rebuild")
+            return
+        if now - self.refreshed_at < self.refresh_seconds:
+            return
+        # Only one request pays for the incremental refresh, the rest keep going
+        if self._build_lock.acquire(blocking=False):
+            try:
+                self._load()
+            finally:
+                self._build_lock.release()
+
+    def _expand(self, token):
+        if token in self.postings:
+            yield token, 1.0
+
+        index = bisect_left(self.terms, token)
+        expanded = 0
+        while index < len(self.terms) and expanded < MAX_PREFIX_EXPANSIONS:
+            term = self.terms[index]
+            if not term.startswith(token):
+                break
+            if term != token:
+                expanded += 1
+                yield term, PREFIX_FACTOR
+            index += 1
+
+    def _fuzzy(self, token):
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_terms.get(gram, ()))
+        max_typos = 1 if len(token) <= 5 else 2
+        for term, count in shared.items():
+            similarity = count / (len(grams) + len(trigrams(term)) - count)
+            if similarity < FUZZY_MIN_SIMILARITY:
+                typos = edit_distance(token, term, max_typos)
+                if typos > max_typos:
+                    continue
+                similarity = 1 - typos / max(len(token), len(term))
+            yield term, FUZZY_FACTOR * similarity
+
+    def _token_scores(self, token):
+        matches = list(self._expand(token))
+        if not matches and len(token) >= 3:
+            matches = list(self._fuzzy(token))
+
+        scores = {}
+        for term, factor in matches:
+            for movie_id, weight in self.postings[term].items():
+                score = weight * factor
+                if score > scores.get(movie_id, 0.0):
+                    scores[movie_id] = score
+        return scores
+
+    def search(self, query, offset=0, limit=10):
+        self.ensure_fresh()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], 0
+
+        phrase = " ".join(tokens)
+        with self._lock:
+            scores = None
+            for token in tokens:
+                token_scores = self._token_scores(token)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {
+                        movie_id: score + token_scores[movie_id]
+                        for movie_id, score in scores.items()
+                        if movie_id in token_scores
+                    }
+                if not scores:
+                    return [], 0
+
+            for movie_id in scores:
+                title = self.titles.get(movie_id, "")
+                if title == phrase:
+                    scores[movie_id] += 5.0
+                elif title.startswith(phrase):
+                    scores[movie_id] += 2.0
+
+            ranked = sorted(
+                scores,
+                key=lambda movie_id: (-scores[movie_id], -self.popularity.get(movie_id, 0.0), str(movie_id)),
+            )
+        return ranked[offset:offset + limit], len(ranked)
+
+
+search_index = extension("search_index")
@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import time
+import zlib
+import numpy as np
+from app.extensions import catalog_db
+
+
+# 32 bands of 4 rows: movies with keyword Jaccard ~0.42 collide in at least
+# one band half the time, ~0.7 almost always
+NUM_PERM = 128
+BANDS = 32
+MERSENNE_PRIME = (1 << 31) - 1
+MAX_CANDIDATES = 2000
+SIGNATURE_CHUNK = 4096
+INDEX_VERSION = 1
+KEEP_VERSIONS = 2
+
+
+def keyword_token(keyword):
+    keyword_id = keyword.get("id")
+    if isinstance(keyword_id, int):
+        return keyword_id % MERSENNE_PRIME
+    return zlib.crc32(str(keyword.get("name") or keyword_id).lower().encode("utf-8")) % MERSENNE_PRIME
+
+
+def hash_params(num_perm, seed):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(indptr, tokens, a, b):
+    # Row i is the MinHash of tokens[indptr[i]:indptr[i + 1]] under every
+    # (a * x + b) mod p permutation; every row needs at least one token
+    signatures = np.empty((len(indptr) - 1, len(a)), dtype=np.uint32)
+    for start in range(0, len(indptr) - 1, SIGNATURE_CHUNK):
+        end = min(start + SIGNATURE_CHUNK, len(indptr) - 1)
+        lo, hi = indptr[start], indptr[end]
+        hashed = (np.outer(tokens[lo:hi].astype(np.uint64), a) + b) % MERSENNE_PRIME
+        signatures[start:end] = np.minimum.reduceat(hashed, indptr[start:end] - lo, axis=0)
+    return signatures
+
+
+def band_keys(signatures, multipliers):
+    # One 64-bit key per band: a random linear combination of the band's rows,
+    # wrapping mod 2**64
+    bands = len(multipliers)
+    rows = signatures.shape[-1] // bands
+    shaped = signatures.reshape(signatures.shape[:-1] + (bands, rows)).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        return (shaped * multipliers).sum(axis=-1, dtype=np.uint64)
+
+
+def build_index(output_dir, database=None, num_perm=NUM_PERM, bands=BANDS, seed=1):
+    if num_perm % bands:
+        raise ValueError("num_perm must be a multiple of bands")
+    database = database if database is not None else catalog_db
+
+    movie_ids, token_sets = [], []
+    for doc in database.keywords.find({}, {"_id": 0, "id": 1, "keywords": 1}):
+        tokens = sorted({keyword_token(keyword) for keyword in doc.get("keywords") or [] if isinstance(keyword, dict)})
+        if doc.get("id") is None or not tokens:
+            continue
+        movie_ids.append(str(doc["id"]))
+        token_sets.append(tokens)
+
+    indptr = np.zeros(len(token_sets) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(tokens) for tokens in token_sets])
+    tokens = np.fromiter((token for tokens in token_sets for token in tokens), dtype=np.int64, count=indptr[-1])
+
+    a, b = hash_params(num_perm, seed)
+    multipliers = np.random.default_rng(seed + 1).integers(1, 2 ** 63, (bands, num_perm // bands),
+                                                           dtype=np.uint64) | np.uint64(1)
+    signatures = minhash_signatures(indptr, tokens, a, b)
+    keys = band_keys(signatures, multipliers).T
+    order = np.argsort(keys, axis=1, kind="stable").astype(np.int32)
+    sorted_keys = np.take_along_axis(keys, order, axis=1)
+
+    # Each build gets its own directory; CURRENT names the live one and is
+    # swapped atomically, so readers never see a half-written index
+    os.makedirs(output_dir, exist_ok=True)
+    version = f"v{int(time.time() * 1000)}"
+    version_dir = os.path.join(output_dir, version)
+    os.makedirs(version_dir)
+    arrays = {
+        "movie_ids": np.array(movie_ids, dtype=str),
+        "indptr": indptr,
+        "tokens": tokens,
+        "signatures": signatures,
+        "band_keys": np.ascontiguousarray(sorted_keys),
+        "band_rows": np.ascontiguousarray(order),
+        "hash_a": a,
+        "hash_b": b,
+        "band_multipliers": multipliers,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(version_dir, f"{name}.npy"), array)
+    with open(os.path.join(version_dir, "meta.json"), "w") as f:
+        json.dump({"version": INDEX_VERSION, "num_perm": num_perm, "bands": bands, "seed": seed,
+                   "movies": len(movie_ids), "built_at": time.time()}, f)
+
+    current = os.path.join(output_dir, "CURRENT")
+    with open(f"{current}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{current}.tmp", current)
+
+    versions = sorted(name for name in os.listdir(output_dir) if name.startswith("v") and name != version)
+    for stale in versions[:max(len(versions) - (KEEP_VERSIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(output_dir, stale), ignore_errors=True)
+    return SimilarIndex.load(version_dir)
+
+
+class SimilarIndex:
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.built_at = meta["built_at"]
+        for name, array in arrays.items():
+            # Plain ndarray views of the maps: same pages, cheaper slicing
+            setattr(self, name, np.asarray(array))
+        self.movie_rows = {movie_id: row for row, movie_id in enumerate(self.movie_ids.tolist())}
+
+    @classmethod
+    def load(cls, version_dir):
+        with open(os.path.join(version_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported similar index version {meta.get('version')}")
+        # Memory-mapped: workers share the page cache instead of each holding a copy
+        arrays = {
+            name[:-4]: np.load(os.path.join(version_dir, name), mmap_mode="r", allow_pickle=False)
+            for name in os.listdir(version_dir) if name.endswith(".npy")
+        }
+        return cls(meta, arrays)
+
+    @classmethod
+    def load_current(cls, current_path):
+        with open(current_path) as f:
+            version = f.read().strip()
+        return cls.load(os.path.join(os.path.dirname(current_path), version))
+
+    def _tokens(self, row):
+        return self.tokens[self.indptr[row]:self.indptr[row + 1]]
+
+    def candidates(self, row):
+        keys = band_keys(np.asarray(self.signatures[row]), self.band_multipliers)
+        found = []
+        for band, key in enumerate(keys):
+            band_keys_sorted = self.band_keys[band]
+            lo = np.searchsorted(band_keys_sorted, key, side="left")
+            hi = np.searchsorted(band_keys_sorted, key, side="right")
+            if hi > lo:
+                found.append(self.band_rows[band, lo:hi])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(found))
+        candidates = candidates[candidates != row]
+        if len(candidates) > MAX_CANDIDATES:
+            # Very common keyword sets: keep the best by signature agreement
+            agreement = (np.asarray(self.signatures[candidates]) == np.asarray(self.signatures[row])).mean(axis=1)
+            candidates = candidates[np.argpartition(-agreement, MAX_CANDIDATES - 1)[:MAX_CANDIDATES]]
+        return candidates.astype(np.int64)
+
+    def similar(self, movie_id, limit=10):
+        # (movie_id, exact keyword Jaccard) for the LSH candidates, best first
+        row = self.movie_rows.get(str(movie_id))
+        if row is None:
+            return None
+        candidates = self.candidates(row)
+        if not len(candidates):
+            return []
+
+        # Exact Jaccard for every candidate at once: gather their token runs
+        # into one array and count the members of the query's set per run.
+        # The gathered runs repeat tokens, so isin must not assume_unique.
+        query = np.asarray(self._tokens(row))
+        starts = np.asarray(self.indptr[candidates])
+        lengths = np.asarray(self.indptr[candidates + 1]) - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+        matches = np.isin(np.asarray(self.tokens[positions]), query).astype(np.int64)
+        intersections = np.add.reduceat(matches, offsets)
+        jaccard = intersections / (len(query) + lengths - intersections)
+
+        order = np.lexsort((candidates, -jaccard))[:limit]
+        return [(str(self.movie_ids[candidates[i]]), float(jaccard[i])) for i in order if jaccard[i] > 0]
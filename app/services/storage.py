@@ -0,0 +1,164 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from app.services.metrics import record_signed_urls, timed
+
+
+CONTAINER_NAME = "images"
+SIGNED_URL_EXPIRY_MINUTES = 15
+SIGNED_URL_BUCKET_SECONDS = 300
+SIGNED_URL_CACHE_SIZE = 50000
+
+
+def parse_connection_string(connect_str):
+    settings = {}
+    for part in (connect_str or "").split(";"):
+        if not part:
+            continue
+        key, _, value = part.partition("=")
+        settings[key.strip()] = value.strip()
+    return settings
+
+
+class SignedUrlCache:
+    # Bounded LRU of signed URLs keyed by blob name. Each entry remembers the
+    # expiry it was signed with and is only returned for that same expiry.
+    def __init__(self, maxsize=SIGNED_URL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, blob_name, expiry):
+        with self._lock:
+            entry = self._entries.get(blob_name)
+            if entry is None or entry[0] != expiry:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(blob_name)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, blob_name, expiry, url):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[blob_name] = (expiry, url)
+            self._entries.move_to_end(blob_name)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class BlobSigner:
+    # Long-lived SAS signer. The connection string is parsed once and every
+    # signature reuses the same account name, key and base URL.
+    #
+    # Expiry is snapped to fixed buckets: every URL signed during a bucket
+    # expires `expiry_minutes` after the bucket ends, so the same blob gets the
+    # byte-identical URL (and browser/CDN cache hits) until the bucket rolls over,
+    # and a handed-out URL is always valid for at least `expiry_minutes`.
+    def __init__(self, account_name, account_key, base_url, container_name=CONTAINER_NAME,
+                 expiry_minutes=SIGNED_URL_EXPIRY_MINUTES, bucket_seconds=SIGNED_URL_BUCKET_SECONDS,
+                 cache_size=SIGNED_URL_CACHE_SIZE):
+        self.account_name = account_name
+        self.account_key = account_key
+        self.container_name = container_name
+        self.expiry_seconds = expiry_minutes * 60
+        self.bucket_seconds = max(int(bucket_seconds), 1)
+        self.container_url = f"{base_url.rstrip('/')}/{container_name}"
+        self.cache = SignedUrlCache(cache_size)
+
+    @classmethod
+    def from_connection_string(cls, connect_str, **kwargs):
+        settings = parse_connection_string(connect_str)
+        account_name = settings.get("AccountName")
+        account_key = settings.get("AccountKey")
+        if not account_name or not account_key:
+            raise ValueError("Storage connection string must contain AccountName and AccountKey")
+
+        base_url = settings.get("BlobEndpoint")
+        if not base_url:
+            protocol = settings.get("DefaultEndpointsProtocol", "https")
+            suffix = settings.get("EndpointSuffix", "core.windows.net")
+            base_url = f"{protocol}://{account_name}.blob.{suffix}"
+        return cls(account_name, account_key, base_url, **kwargs)
+
+    def current_expiry(self, now=None):
+        now = time.time() if now is None else now
+        bucket_end = (int(now) // self.bucket_seconds + 1) * self.bucket_seconds
+        return bucket_end + self.expiry_seconds
+
+    def _sign(self, blob_name, expiry):
+        # The Azure SDK takes longer to import than the rest of the app; only
+        # pay for it once something is actually signed
+        from azure.storage.blob import generate_blob_sas
+        sas_token = generate_blob_sas(
+            account_name=self.account_name,
+            container_name=self.container_name,
+            blob_name=blob_name,
+            account_key=self.account_key,
+            permission="r",
+            expiry=expiry,
+        )
+        return f"{self.container_url}/{blob_name}?{sas_token}"
+
+    def sign(self, blob_name):
+        return self.sign_many([blob_name])[blob_name]
+
+    def sign_many(self, blob_names):
+        expiry = self.current_expiry()
+        expiry_str = None
+        signed = {}
+        new_signatures = 0
+        with timed("sign"):
+            for blob_name in blob_names:
+                if blob_name in signed:
+                    continue
+                url = self.cache.get(blob_name, expiry)
+                if url is None:
+                    if expiry_str is None:
+                        expiry_str = datetime.fromtimestamp(expiry, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                    url = self._sign(blob_name, expiry_str)
+                    self.cache.put(blob_name, expiry, url)
+                    new_signatures += 1
+                signed[blob_name] = url
+        record_signed_urls(len(signed), new_signatures)
+        return signed
+
+
+def create_blob_signer(connect_str=None, **kwargs):
+    connect_str = connect_str or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    return BlobSigner.from_connection_string(connect_str, **kwargs) if connect_str else None
+
+
+def get_blob_signer():
+    signer = current_app.extensions.get("blob_signer")
+    if signer is None:
+        raise ValueError("AZURE_STORAGE_CONNECTION_STRING is not configured")
+    return signer
+
+
+def poster_blob(movie_id):
+    return f"posters/{movie_id}.jpg"
+
+
+def profile_blob(person_id):
+    return f"tmdb_profile_photos/{person_id}.jpg"
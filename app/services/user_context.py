@@ -0,0 +1,109 @@
+import threading
+import time
+from flask import g, has_app_context
+from app.extensions import db, extension
+
+
+class UserContext:
+    # A user's watchlist and preferences, with the lookups the routes need
+    def __init__(self, user_id, user_details=None, watchlist=None):
+        self.user_id = user_id
+        self.user_details = user_details or {}
+        self.watchlist = watchlist or {}
+
+        self.watchlist_ids = list(self.watchlist.get("movie_ids", []))
+        self.watchlisted_ids = set(self.watchlist_ids)
+        self.movie_entries = self.user_details.get("movie_ids", [])
+        self.liked_lookup = {
+            str(entry["movie_id"]): entry.get("preference")
+            for entry in self.movie_entries
+            if entry.get("movie_id")
+        }
+        self.liked_actor_ids = set(self.user_details.get("actor_ids", []))
+        self.liked_genre_ids = set(self.user_details.get("genre_ids", []))
+
+
+class UserContextCache:
+    # Optional cross-request cache of raw user documents. Entries live for
+    # `ttl` seconds and are dropped by the routes that change them; a ttl of
+    # 0 disables it.
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            return entry[1]
+
+    def put(self, user_id, documents):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, documents)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_context_cache = extension("user_context_cache")
+
+
+def user_documents_pipeline(user_id):
+    # user_details and watchlists for the user in a single round trip
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$limit": 1},
+        {"$set": {"_source": "user_details"}},
+        {"$unionWith": {
+            "coll": "watchlists",
+            "pipeline": [
+                {"$match": {"user_id": user_id}},
+                {"$limit": 1},
+                {"$set": {"_source": "watchlists"}},
+            ],
+        }},
+    ]
+
+
+def fetch_user_documents(user_id):
+    documents = db.user_details.aggregate(user_documents_pipeline(user_id))
+    user_details, watchlist = None, None
+    for document in documents:
+        if document.pop("_source") == "user_details":
+            user_details = document
+        else:
+            watchlist = document
+    return user_details, watchlist
+
+
+def get_user_context(user_id=None):
+    user_id = user_id if user_id is not None else g.user_id
+    context = g.get("user_context") if has_app_context() else None
+    if context is not None and context.user_id == user_id:
+        return context
+
+    documents = user_context_cache.get(user_id)
+    if documents is None:
+        documents = fetch_user_documents(user_id)
+        user_context_cache.put(user_id, documents)
+
+    context = UserContext(user_id, *documents)
+    if has_app_context():
+        g.user_context = context
+    return context
+
+
+def invalidate_user_context(user_id):
+    user_context_cache.invalidate(user_id)
+    if has_app_context() and "user_context" in g:
+        g.pop("user_context")
@@ -0,0 +1,44 @@
+import gzip
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def init_compression(app, min_bytes=1024, level=5):
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        # Streamed and file responses (ndjson, posters) pass through untouched
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or response.status_code == 206
+            or "Content-Encoding" in response.headers
+            or not _compressible(response)
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if request.accept_encodings["gzip"] <= 0:
+            return response
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+        response.headers["Content-Encoding"] = "gzip"
+        # The representation changed, so a strong validator no longer matches it
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,4 +1,25 @@
 from math import ceil
+from datetime import datetime
+import base64
+from bson import Decimal128, ObjectId, json_util
+from bson.errors import BSONError
+from pymongo import ASCENDING, DESCENDING
+
+def int_arg(args, name, default, minimum=1, maximum=None):
+    # An integer query argument; the ValueError message is meant for a 400
+    raw = args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if maximum is not None and not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return value
+
 
 def paginate(queryset, page: int = 1, limit: int = 10):
     skip = (page - 1) * limit
@@ -6,6 +27,119 @@ def paginate(queryset, page: int = 1, limit: int = 10):
     return paginated, skip
 
 
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+# Sort values a cursor may carry. Cursors come from clients and their values
+# go into the filter, so anything that could act as an operator or pattern
+# (documents, arrays, regexes) is refused.
+CURSOR_VALUE_TYPES = (type(None), bool, int, float, str, datetime, Decimal128, ObjectId)
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, ArithmeticError, BSONError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    value, last_id = values
+    if not isinstance(value, CURSOR_VALUE_TYPES) or not isinstance(last_id, ObjectId):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(sort_field, direction, cursor):
+    # Documents strictly after (value, _id) in (sort_field, _id) order. Mongo
+    # sorts null/missing values lowest, so they come last when descending and
+    # first when ascending.
+    value, last_id = decode_cursor(cursor)
+    if sort_field == "_id":
+        return {"_id": {"$lt" if direction == DESCENDING else "$gt": last_id}}
+
+    op = "$lt" if direction == DESCENDING else "$gt"
+    if direction == DESCENDING:
+        if value is None:
+            clauses = [{sort_field: None, "_id": {op: last_id}}]
+        else:
+            clauses = [{sort_field: {op: value}}, {sort_field: value, "_id": {op: last_id}}, {sort_field: None}]
+    else:
+        if value is None:
+            clauses = [{sort_field: {"$ne": None}}, {sort_field: None, "_id": {op: last_id}}]
+        else:
+            clauses = [{sort_field: {op: value}}, {sort_field: value, "_id": {op: last_id}}]
+    return {"$or": clauses}
+
+
+def _keyset_spec(query, sort_field, direction, cursor, projection):
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort_field, direction, cursor)]} if query else keyset_filter(sort_field, direction, cursor)
+
+    if projection is not None and sort_field != "_id":
+        projection = {**projection, sort_field: 1}
+
+    sort = [(sort_field, direction)]
+    if sort_field != "_id":
+        sort.append(("_id", direction))
+    return query or {}, sort, projection
+
+
+def _field_value(doc, path):
+    # The value at a dotted path, None when any part is missing
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _keyset_page(docs, sort_field, limit):
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor([_field_value(last, sort_field) if sort_field != "_id" else None, last["_id"]])
+    return docs, next_cursor
+
+
+def keyset_paginate(collection, query, sort_field="_id", direction=ASCENDING, cursor=None, limit: int = 10, projection=None):
+    # Cursor pagination on (sort_field, _id): cost stays flat however deep the
+    # client pages, unlike skip(). Pass cursor=None (or "") for the first page.
+    page_query, sort, projection = _keyset_spec(query, sort_field, direction, cursor, projection)
+    docs = list(collection.find(page_query, projection).sort(sort).limit(limit + 1))
+    return _keyset_page(docs, sort_field, limit)
+
+
+def facet_pipeline(query, sort, skip=0, limit: int = 10, projection=None, page_query=None):
+    # One aggregation for a page of `query` and its total count, instead of a
+    # count_documents plus a find over the same filter. `page_query` narrows
+    # only the page (keyset pagination), not the total.
+    page_stages = [{"$match": page_query}] if page_query else []
+    page_stages += [{"$sort": dict(sort)}, {"$skip": skip}, {"$limit": limit}]
+    if projection:
+        page_stages.append({"$project": projection})
+    return [
+        {"$match": query or {}},
+        {"$facet": {"page": page_stages, "total": [{"$count": "count"}]}},
+    ]
+
+
+def facet_paginate(collection, query, sort, skip=0, limit: int = 10, projection=None, page_query=None):
+    result = next(collection.aggregate(facet_pipeline(query, sort, skip, limit, projection, page_query)), None) or {}
+    total = result.get("total") or [{}]
+    return result.get("page", []), total[0].get("count", 0)
+
+
+def keyset_facet_paginate(collection, query, sort_field="_id", direction=ASCENDING, cursor=None, limit: int = 10, projection=None):
+    # keyset_paginate plus the total count of `query`, in one round trip
+    page_query, sort, projection = _keyset_spec({}, sort_field, direction, cursor, projection)
+    docs, total = facet_paginate(collection, query, sort, 0, limit + 1, projection, page_query)
+    docs, next_cursor = _keyset_page(docs, sort_field, limit)
+    return docs, next_cursor, total
+
+
 def get_genre_list():
     genre_list = ["Action","Adventure","Animation","Aniplex","BROSTA TV","Carousel Productions","Comedy","Crime","Documentary","Drama","Family","Fantasy","Foreign","GoHands","History","Horror","Mardock Scramble Production Committee","Music","Mystery","Odyssey Media","Pulser Productions",
                   "Rogue State","Romance","Science Fiction","Sentai Filmworks","TV Movie","Telescene Film Group Productions","The Cartel","Thriller","Vision View Entertainment","War","Western"
@@ -17,4 +151,4 @@ def get_liked_genres(movie, liked_genre_ids):
         genre_id = genre.get("id")
         genre["liked"] = genre_id in liked_genre_ids
 
-    return movie
\ No newline at end of file
+    return movie
@@ -0,0 +1,57 @@
+from bson import ObjectId, Decimal128
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used without it
+    orjson = None
+
+
+def bson_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    return _default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Flask's provider with BSON types (ObjectId, Decimal128) understood, so
+    # documents can be returned straight from Mongo, and orjson for encoding
+    # when it is installed. Output matches the stdlib path: sorted keys and
+    # dates as HTTP dates; orjson just writes UTF-8 instead of \u escapes.
+    # Anything orjson refuses (ints over 64 bits, say) falls back to the stdlib.
+    default = staticmethod(bson_default)
+
+    def _orjson_options(self, indent=False, sort_keys=None):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+            except orjson.JSONEncodeError:
+                pass
+        dump_args = {"indent": 2} if indent else {"separators": (",", ":")}
+        return super().dumps(obj, **dump_args).encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and set(kwargs) <= {"indent", "separators", "sort_keys"} and kwargs.get("indent") in (None, 2):
+            try:
+                return orjson.dumps(
+                    obj, default=self.default,
+                    option=self._orjson_options(kwargs.get("indent"), kwargs.get("sort_keys")),
+                ).decode("utf-8")
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
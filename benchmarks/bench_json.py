@@ -0,0 +1,80 @@
+# Encode time and bytes on the wire for /movies/list-sized JSON payloads.
+#
+#   python benchmarks/bench_json.py [--movies 20 50 100 --repeat 200]
+#
+# Builds list responses from the synthetic catalog (full documents with
+# ObjectIds and signed poster URLs, as the list endpoint returns them when no
+# fields= projection is given) and times the stdlib and orjson paths of the
+# app's JSON provider, then gzip at a few levels. No database needed.
+import argparse
+import gzip
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from flask import Flask
+from app.utils import json_provider
+from app.utils.json_provider import FastJSONProvider
+from benchmarks.synthetic import make_movie
+
+POSTER_URL = ("https://moviestore.blob.core.windows.net/posters/{id}.jpg?se=2030-01-01T00%3A00%3A00Z"
+              "&sp=r&sv=2025-01-05&sr=b&sig=Zm9vYmFyYmF6cXV4Zm9vYmFyYmF6cXV4Zm9vYmFyYmF6cXU%3D")
+
+
+def payload(rng, movies):
+    docs = []
+    for movie_id in range(1, movies + 1):
+        movie = make_movie(rng, movie_id)
+        movie["_id"] = ObjectId()
+        movie["poster_url"] = POSTER_URL.format(id=movie_id)
+        movie["is_watchlisted"] = rng.random() < 0.1
+        docs.append(movie)
+    return {"movies": docs, "page": 1, "limit": movies, "total": 45000}
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    provider = FastJSONProvider(app)
+    fast = json_provider.orjson
+
+    for movies in args.movies:
+        body = payload(random.Random(args.seed), movies)
+        encoded = provider.dumps_bytes(body)
+        print(f"\n{movies} movies, {len(encoded)} bytes")
+
+        json_provider.orjson = None
+        print(f"  encode stdlib   {timed(lambda: provider.dumps_bytes(body), args.repeat):7.3f}ms")
+        json_provider.orjson = fast
+        if fast is not None:
+            print(f"  encode orjson   {timed(lambda: provider.dumps_bytes(body), args.repeat):7.3f}ms")
+        else:
+            print("  encode orjson   (not installed)")
+
+        for level in (1, 5, 9):
+            size = len(gzip.compress(encoded, compresslevel=level, mtime=0))
+            ms = timed(lambda: gzip.compress(encoded, compresslevel=level, mtime=0), args.repeat)
+            print(f"  gzip level {level}    {ms:7.3f}ms  {size} bytes ({size / len(encoded):.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Latency of GET /movies/movie/<id> through the real route, with its Mongo
+# lookups run one after another or fanned out.
+#
+#   MONGO_CLIENT=mongodb://localhost:27017 python benchmarks/bench_movie_details.py [--repeat 50]
+#   python benchmarks/bench_movie_details.py --mongomock --delay-ms 2
+#
+# Seeds a throwaway database with one movie, its credits, rating summary and
+# the dev user, then requests the detail view through the Flask test client
+# (auth off, FLASK_ENV=development) with a one-thread fan-out pool, which runs
+# the route's lookups sequentially, and with --workers threads. --delay-ms
+# adds latency to every find/aggregate to mimic a remote cluster. The
+# database is dropped afterwards.
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import AZURITE_CONNECTION_STRING, patch_mongomock
+
+DATABASE = "movieflix_bench_details"
+
+
+def seed(database):
+    database.movies_metadata.insert_one({"id": "1", "title": "Bench Movie", "overview": "x" * 500,
+                                         "genres": [{"id": 18, "name": "Drama"}]})
+    database.credits.insert_one({
+        "id": "1",
+        "cast": [{"id": i, "name": f"Actor {i}", "character": f"Role {i}"} for i in range(200)],
+        "crew": [{"id": 1000 + i, "name": f"Crew {i}", "job": "Director" if i % 50 == 0 else "Grip"}
+                 for i in range(400)],
+    })
+    database.rating_stats.insert_one({"_id": "1", "count": 1000, "sum": 3500.0, "histogram": {"7": 1000}})
+    database.user_details.insert_one({"user_id": "dev_user", "actor_ids": [1, 2, 3], "genre_ids": [18],
+                                      "movie_ids": [{"movie_id": "1", "preference": "Like"}]})
+    database.watchlists.insert_one({"user_id": "dev_user", "movie_ids": ["1"]})
+
+
+def add_latency(collection_class, seconds):
+    # Every find (find_one goes through it) and aggregate is one round trip
+    for name in ("find", "aggregate"):
+        original = getattr(collection_class, name)
+
+        def delayed(self, *args, _original=original, **kwargs):
+            time.sleep(seconds)
+            return _original(self, *args, **kwargs)
+
+        setattr(collection_class, name, delayed)
+
+
+def timed(client, url, repeat):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise SystemExit(f"{url} answered {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="extra latency added to every lookup")
+    parser.add_argument("--workers", type=int, default=8, help="fan-out threads for the concurrent run")
+    parser.add_argument("--mongomock", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["FLASK_ENV"] = "development"
+    os.environ["AZURE_STORAGE_CONNECTION_STRING"] = AZURITE_CONNECTION_STRING
+
+    import app as app_package
+    from app.config import load_settings
+    from app.services.executor import FanoutExecutor
+
+    if args.mongomock:
+        import mongomock
+        patch_mongomock()
+        app_package.MongoClient = mongomock.MongoClient
+        collection_class = mongomock.collection.Collection
+    else:
+        from pymongo.collection import Collection as collection_class
+
+    settings = load_settings(
+        mongo_uri=os.getenv("MONGO_CLIENT", "mongodb://localhost:27017"),
+        mongo_db=DATABASE,
+        metrics_enabled=False,
+    )
+    app = app_package.create_app(settings)
+    client = app.extensions["mongo"].client
+    client.drop_database(DATABASE)
+    seed(client[DATABASE])
+    if args.delay_ms:
+        add_latency(collection_class, args.delay_ms / 1000)
+
+    test_client = app.test_client()
+    for label, workers in (("sequential", 1), (f"concurrent ({args.workers} workers)", args.workers)):
+        app.extensions["fanout_executor"] = FanoutExecutor(workers)
+        median, p95 = timed(test_client, "/movies/movie/1", args.repeat)
+        print(f"{label:<26} median {median:7.2f} ms   p95 {p95:7.2f} ms")
+
+    client.drop_database(DATABASE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Skip vs keyset pagination latency on a local mongod.
+#
+#   MONGO_CLIENT=mongodb://localhost:27017 python benchmarks/bench_pagination.py [--movies 100000]
+#
+# Seeds a throwaway database with synthetic movies, then times page 1 and a
+# deep page with skip()/limit() (the `page` parameter) and with keyset
+# cursors (the `cursor` parameter), sorted by popularity like
+# /movies/list?sort_by=popularity. The database is dropped afterwards.
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import DESCENDING, MongoClient
+from app.utils.helper import encode_cursor, keyset_paginate, paginate
+
+
+def seed(collection, count):
+    collection.drop()
+    batch = []
+    for i in range(count):
+        batch.append({"id": str(i), "title": f"Movie {i}", "popularity": round(random.random() * 100, 3)})
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    collection.create_index([("popularity", DESCENDING), ("_id", DESCENDING)])
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--deep-page", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGO_CLIENT", "mongodb://localhost:27017"))
+    database = client.movieflix_bench_pagination
+    collection = database.movies_metadata
+    seed(collection, max(args.movies, args.deep_page * args.limit + args.limit))
+
+    # Cursor that points at the end of the page before the deep page
+    skip = (args.deep_page - 1) * args.limit
+    anchor = collection.find().sort([("popularity", DESCENDING), ("_id", DESCENDING)]).skip(skip - 1).limit(1).next()
+    deep_cursor = encode_cursor([anchor["popularity"], anchor["_id"]])
+
+    def skip_page(page):
+        cursor, _ = paginate(collection.find().sort([("popularity", DESCENDING), ("_id", DESCENDING)]), page, args.limit)
+        return list(cursor)
+
+    results = {
+        "skip page 1": timed(lambda: skip_page(1), args.repeat),
+        f"skip page {args.deep_page}": timed(lambda: skip_page(args.deep_page), args.repeat),
+        "cursor page 1": timed(lambda: keyset_paginate(collection, {}, "popularity", DESCENDING, None, args.limit), args.repeat),
+        f"cursor page {args.deep_page}": timed(lambda: keyset_paginate(collection, {}, "popularity", DESCENDING, deep_cursor, args.limit), args.repeat),
+    }
+    for label, millis in results.items():
+        print(f"{label:<24} {millis:8.2f} ms (median of {args.repeat})")
+
+    client.drop_database(database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Scoring latency of the recommendation model at catalog scale.
+#
+#   python benchmarks/bench_recommend.py [--movies 45000 --actors 120000 --repeat 500]
+#
+# Builds a random model the size of the full TMDB catalog in memory (no
+# database needed), saves and reloads it through the same .npz format the
+# build-recommender command writes, then times recommend() for users with a
+# handful to a few hundred liked movies. Prints the load time and p50/p99 per
+# user profile size.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.recommender import CAST_PER_MOVIE, RecommenderModel, _feature_matrix
+
+
+def random_model(movies, actors, genres, seed):
+    rng = np.random.default_rng(seed)
+    genre_counts = rng.integers(1, 4, movies)
+    genre_rows = np.repeat(np.arange(movies), genre_counts)
+    genre_cols = rng.integers(0, genres, genre_rows.size)
+    cast_rows = np.repeat(np.arange(movies), CAST_PER_MOVIE)
+    # Zipf-ish: a few actors appear in many movies
+    cast_cols = np.minimum(rng.zipf(1.3, cast_rows.size) - 1, actors - 1)
+    cast_weights = np.tile(1.0 / np.sqrt(np.arange(1, CAST_PER_MOVIE + 1)), movies)
+    return RecommenderModel(
+        movie_ids=np.array([str(i) for i in range(movies)], dtype=object),
+        genre_ids=np.arange(genres).astype(object),
+        actor_ids=np.arange(actors).astype(object),
+        genres=_feature_matrix(genre_rows, genre_cols, np.ones(genre_rows.size), (movies, genres)),
+        cast=_feature_matrix(cast_rows, cast_cols, cast_weights, (movies, actors)),
+        prior=rng.random(movies).astype(np.float32),
+        built_at=time.time(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=45000)
+    parser.add_argument("--actors", type=int, default=120000)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    model = random_model(args.movies, args.actors, args.genres, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recommender.npz")
+        model.save(path)
+        started = time.perf_counter()
+        model = RecommenderModel.load(path)
+        print(f"model: {args.movies} movies, {model.genres.nnz + model.cast.nnz} non-zeros, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB, loaded in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(args.seed)
+    for liked_count in (0, 5, 50, 500):
+        timings = []
+        for _ in range(args.repeat):
+            liked = [str(i) for i in rng.integers(0, args.movies, liked_count)]
+            watchlist = [str(i) for i in rng.integers(0, args.movies, 30)]
+            started = time.perf_counter()
+            model.recommend(liked, liked[:liked_count // 5], rng.integers(0, args.genres, 3).tolist(),
+                            rng.integers(0, args.actors, 10).tolist(), liked + watchlist, 20)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"liked {liked_count:>4}: p50 {statistics.median(timings) * 1000:.2f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Micro-benchmark for SAS URL signing.
+#
+#   python benchmarks/bench_signing.py [--n 2000]
+#
+# Compares the old per-call path (parse the connection string and build a
+# BlobServiceClient for every URL) with the long-lived BlobSigner, one URL at a
+# time and in batches, with the signed-URL cache off and warm. Uses the public Azurite development account key, no
+# network access is needed.
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
+from app.services.storage import BlobSigner
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+def sign_per_call(filename):
+    blob_service_client = BlobServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
+    sas_token = generate_blob_sas(
+        account_name=blob_service_client.account_name,
+        container_name="images",
+        blob_name=filename,
+        account_key=blob_service_client.credential.account_key,
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.utcnow() + timedelta(minutes=15)
+    )
+    return f"https://{blob_service_client.account_name}.blob.core.windows.net/images/{filename}?{sas_token}"
+
+
+def rate(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n / elapsed:>12,.0f} signings/s  ({elapsed * 1000:.1f} ms for {n})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    args = parser.parse_args()
+
+    names = [f"tmdb_profile_photos/{i}.jpg" for i in range(args.n)]
+    uncached = BlobSigner.from_connection_string(AZURITE_CONNECTION_STRING, cache_size=0)
+    cached = BlobSigner.from_connection_string(AZURITE_CONNECTION_STRING)
+    cached.sign_many(names)
+
+    rate("per-call client (before)", args.n, lambda: [sign_per_call(name) for name in names])
+    rate("BlobSigner.sign", args.n, lambda: [uncached.sign(name) for name in names])
+    rate("BlobSigner.sign_many", args.n, lambda: uncached.sign_many(names))
+    rate("sign_many, warm cache", args.n, lambda: cached.sign_many(names))
+    print("cache:", cached.cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Build time, lookup latency and recall of the keyword MinHash/LSH index.
+#
+#   MONGO_CLIENT=mongodb://localhost:27017 python benchmarks/bench_similar.py [--movies 45000 --queries 500]
+#   python benchmarks/bench_similar.py --mongomock
+#
+# Seeds a throwaway keywords collection with clustered random keyword sets,
+# builds the index into a temporary directory, then times candidate lookup and
+# the full similar() call (lookup plus exact Jaccard re-ranking) and measures
+# recall against brute-force Jaccard for pairs at or above --threshold.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.similar import build_index
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=45000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--mongomock", action="store_true")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(os.getenv("MONGO_CLIENT", "mongodb://localhost:27017"))
+    database = client.movieflix_bench_similar
+    client.drop_database(database)
+
+    rng = np.random.default_rng(3)
+    keyword_sets = {}
+    docs = []
+    # Movies are noisy copies of a few thousand keyword "themes" plus random
+    # extras skewed towards low (common) ids, so near neighbours exist
+    themes = [rng.integers(0, args.vocabulary, rng.integers(4, 12)) for _ in range(max(args.movies // 20, 1))]
+    for movie_id in range(args.movies):
+        theme = themes[rng.integers(len(themes))]
+        extras = (args.vocabulary * rng.random(rng.integers(0, 4)) ** 3).astype(int)
+        ids = {int(k) for k in theme[rng.random(len(theme)) < 0.8]} | {int(k) for k in extras}
+        if not ids:
+            ids = {int(theme[0])}
+        keyword_sets[str(movie_id)] = ids
+        docs.append({"id": str(movie_id), "keywords": [{"id": k, "name": f"keyword {k}"} for k in ids]})
+    database.keywords.insert_many(docs)
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        index = build_index(directory, database)
+        print(f"built {len(index.movie_ids)} movies in {time.perf_counter() - started:.2f}s")
+
+        queries = rng.choice(len(index.movie_ids), min(args.queries, len(index.movie_ids)), replace=False)
+        lookup, full = [], []
+        hits = wanted = 0
+        for row in queries:
+            movie_id = str(index.movie_ids[row])
+            started = time.perf_counter()
+            index.candidates(row)
+            lookup.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            found = {similar_id for similar_id, _ in index.similar(movie_id, limit=len(index.movie_ids))}
+            full.append(time.perf_counter() - started)
+
+            query = keyword_sets[movie_id]
+            expected = {other for other, keywords in keyword_sets.items()
+                        if other != movie_id and len(query & keywords) / len(query | keywords) >= args.threshold}
+            hits += len(expected & found)
+            wanted += len(expected)
+
+    for label, timings in (("candidate lookup", lookup), ("similar()", full)):
+        timings.sort()
+        print(f"{label}: p50 {statistics.median(timings) * 1000:.3f} ms, p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f} ms")
+    print(f"recall at Jaccard >= {args.threshold}: {hits / wanted:.3f} ({wanted} pairs)" if wanted else "no pairs above threshold")
+    client.drop_database(database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Cold start: time to import the app, build it and serve a first request.
+#
+#   python benchmarks/bench_startup.py [--runs 5 --top 20]
+#
+# Each run is a fresh interpreter started with `python -X importtime`, so the
+# numbers include every import the app pulls in. No database or storage is
+# needed: the Mongo client connects lazily and the first request is /healthz.
+# Prints median wall times per phase and the import time per top-level
+# package (self time summed over its modules, from the median run).
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get("/healthz")
+served = time.perf_counter()
+print(f"TIMES {imported - started} {created - imported} {served - created}")
+"""
+
+ENV = {
+    "MONGO_CLIENT": "mongodb://127.0.0.1:27017/?connect=false",
+    "AZURE_STORAGE_CONNECTION_STRING": (
+        "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+        "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+        "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+    ),
+    "FLASK_ENV": "production",
+}
+
+
+def run_once():
+    env = {**os.environ, **ENV, "PYTHONPATH": ROOT}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    times = next(line.split()[1:] for line in result.stdout.splitlines() if line.startswith("TIMES"))
+    by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    return [float(value) * 1000 for value in times], by_package
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    phases = list(zip(*(times for times, _ in runs)))
+    for name, samples in zip(("import app", "create_app", "first request"), phases):
+        print(f"{name:14} {statistics.median(samples):8.1f}ms")
+    totals = [sum(times) for times, _ in runs]
+    print(f"{'total':14} {statistics.median(totals):8.1f}ms")
+
+    median_run = sorted(zip(totals, range(len(runs))))[len(runs) // 2][1]
+    by_package = runs[median_run][1]
+    print(f"\nimport time by package ({sum(by_package.values()) / 1000:.1f}ms total)")
+    for name, micros in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:28} {micros / 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Concurrency check for the preference and watchlist mutations.
+#
+#   MONGO_CLIENT=mongodb://localhost:27017 python benchmarks/concurrent_mutations.py [--workers 32 --adds 500]
+#   python benchmarks/concurrent_mutations.py --mongomock
+#
+# Fires parallel adds for the same user (liked movies, liked actors and
+# watchlist entries, each id added twice as double-clicking clients do) and
+# checks that every id ends up stored exactly once. Exits non-zero if any add
+# was lost or duplicated. Runs against a throwaway database that is dropped
+# afterwards.
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.indexes import ensure_indexes
+from app.services.preferences import add_to_set, push_movie_entry, EXISTS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--adds", type=int, default=500)
+    parser.add_argument("--mongomock", action="store_true")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(os.getenv("MONGO_CLIENT", "mongodb://localhost:27017"))
+    database = client.movieflix_bench_mutations
+    client.drop_database(database)
+    ensure_indexes(database)
+
+    user_id = "concurrency_user"
+    ids = [str(i) for i in range(args.adds)] * 2
+
+    def add(movie_id):
+        movie = push_movie_entry(user_id, {"movie_id": movie_id, "preference": "Like"}, database.user_details)
+        actor = add_to_set(database.user_details, user_id, "actor_ids", int(movie_id))
+        watchlist = add_to_set(database.watchlists, user_id, "movie_ids", movie_id)
+        return movie, actor, watchlist
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        statuses = list(pool.map(add, ids))
+
+    details = list(database.user_details.find({"user_id": user_id}))
+    watchlists = list(database.watchlists.find({"user_id": user_id}))
+    stored_movies = [entry["movie_id"] for entry in details[0].get("movie_ids", [])] if details else []
+    stored_actors = details[0].get("actor_ids", []) if details else []
+    stored_watchlist = watchlists[0].get("movie_ids", []) if watchlists else []
+
+    expected = args.adds
+    checks = {
+        "user_details documents": (len(details), 1),
+        "watchlists documents": (len(watchlists), 1),
+        "liked movies stored": (len(set(stored_movies)), expected),
+        "liked movies duplicated": (len(stored_movies) - len(set(stored_movies)), 0),
+        "liked actors stored": (len(set(stored_actors)), expected),
+        "watchlist entries stored": (len(set(stored_watchlist)), expected),
+        "adds reported as duplicates": (sum(status[0] == EXISTS for status in statuses), expected),
+    }
+
+    failed = False
+    for label, (actual, wanted) in checks.items():
+        ok = actual == wanted
+        failed = failed or not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}: {actual} (expected {wanted})")
+
+    client.drop_database(database)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Local stand-ins for the external services the app talks to.
+#
+# JWKSStub serves a freshly generated RSA key as a JWKS document on a local
+# port and signs Clerk-shaped tokens with it, so require_auth runs its real
+# verification path. AZURITE_CONNECTION_STRING is the well-known Azurite
+# development account; SAS signing is local so nothing has to listen on it.
+# patch_mongomock fills the gaps mongomock has for the pipelines the app runs.
+import base64
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+def _b64url_uint(value):
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+class JWKSStub:
+    def __init__(self, issuer="https://bench.clerk.local", audience=None):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        self.issuer = issuer
+        self.audience = audience or issuer
+        self.kid = f"bench-{uuid.uuid4().hex[:8]}"
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode("ascii")
+        numbers = private_key.public_key().public_numbers()
+        self.jwks = {"keys": [{
+            "kty": "RSA", "use": "sig", "alg": "RS256", "kid": self.kid,
+            "n": _b64url_uint(numbers.n), "e": _b64url_uint(numbers.e),
+        }]}
+        self.fetches = 0
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/.well-known/jwks.json"
+
+    def start(self):
+        stub = self
+        body = json.dumps(self.jwks).encode("utf-8")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.fetches += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def environ(self):
+        return {"CLERK_ISSUER": self.issuer, "CLERK_AUDIENCE": self.audience, "CLERK_JWKS_URL": self.url}
+
+    def token(self, user_id, ttl=3600):
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {"sub": user_id, "iss": self.issuer, "aud": self.audience, "iat": now, "nbf": now, "exp": now + ttl}
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+
+def patch_mongomock():
+    import mongomock.aggregate
+    import mongomock.collection
+    import mongomock.gridfs
+
+    mongomock.gridfs.enable_gridfs_integration()
+
+    # mongomock rewrites projection dicts in place, which races when the app
+    # passes a shared constant such as ID_ONLY from several threads
+    find = mongomock.collection.Collection.find
+    if not getattr(find, "copies_projection", False):
+        def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+            if isinstance(projection, dict):
+                projection = dict(projection)
+            return find(self, filter, projection, *args, **kwargs)
+
+        find_with_copied_projection.copies_projection = True
+        mongomock.collection.Collection.find = find_with_copied_projection
+
+    handlers = mongomock.aggregate._PIPELINE_HANDLERS
+    if handlers.get("$unionWith") is None:
+        def union_with(in_collection, database, options):
+            if isinstance(options, str):
+                options = {"coll": options}
+            other = database[options["coll"]].aggregate(options.get("pipeline", []))
+            return list(in_collection) + list(other)
+
+        handlers["$unionWith"] = union_with
@@ -0,0 +1,249 @@
+# Load test for the read routes against a seeded synthetic catalog.
+#
+#   MONGO_CLIENT=mongodb://localhost:27017 python benchmarks/load_test.py [--movies 5000 --users 200 --clients 16]
+#   python benchmarks/load_test.py --mongomock --movies 500 --requests 200 --output run.json
+#
+# Seeds a throwaway database (or mongomock) with benchmarks/synthetic.py, stubs
+# Clerk with a local JWKS server and signs blob URLs with the Azurite key, then
+# drives every scenario with --clients concurrent clients, each sending
+# authenticated requests as one of the synthetic users. By default requests go
+# over HTTP to a threaded local server; --transport inprocess uses Flask test
+# clients instead. Prints one JSON document with throughput and p50/p95/p99
+# latency per scenario, plus the commit and parameters, so runs can be diffed
+# across commits. The database is dropped afterwards unless --keep is given.
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import AZURITE_CONNECTION_STRING, JWKSStub, patch_mongomock
+from benchmarks.synthetic import GENRES, seed_catalog
+
+SORT_FIELDS = ["popularity", "vote_average", "vote_count", "release_date", "revenue"]
+PAGE_SIZE = 20
+GENRE_NAMES = [name for _, name in GENRES]
+
+
+def scenarios(catalog):
+    movie_ids = catalog["movie_ids"]
+    last_page = max(len(movie_ids) // PAGE_SIZE, 1)
+    words = catalog["title_words"] + catalog["keywords"]
+    return {
+        "list_skinny": lambda rng: f"/movies/list?page={rng.randint(1, 10)}&limit={PAGE_SIZE}",
+        "list_full": lambda rng: f"/movies/list?page={rng.randint(1, 10)}&limit={PAGE_SIZE}&skinny=false",
+        "list_keyword": lambda rng: f"/movies/list?keyword={rng.choice(words)}&limit={PAGE_SIZE}",
+        "list_sorted": lambda rng: f"/movies/list?sort_by={rng.choice(SORT_FIELDS)}&page={rng.randint(1, 10)}&limit={PAGE_SIZE}",
+        "list_deep": lambda rng: f"/movies/list?page={rng.randint(max(last_page - last_page // 10, 1), last_page)}&limit={PAGE_SIZE}",
+        "movie_detail": lambda rng: f"/movies/movie/{rng.choice(movie_ids)}",
+        "watchlist_get": lambda rng: f"/watchlist/get?page=1&limit={PAGE_SIZE}",
+        "watchlist_filtered": lambda rng: f"/watchlist/get?genre={rng.choice(GENRE_NAMES).split()[0]}&year={rng.randint(1920, 2024)}&limit={PAGE_SIZE}",
+        "user_preference": lambda rng: "/user/user_preference",
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, sizes, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_response_bytes": round(statistics.fmean(sizes)) if sizes else 0,
+        "latency_ms": {
+            "mean": ms(statistics.fmean(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]) if latencies else None,
+        },
+    }
+
+
+class HttpTransport:
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self._server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._local = threading.local()
+
+    def get(self, path, headers):
+        import requests
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.get(self.base_url + path, headers=headers)
+        return response.status_code, len(response.content)
+
+    def close(self):
+        self._server.shutdown()
+
+
+class InProcessTransport:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def get(self, path, headers):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.get(path, headers=headers)
+        return response.status_code, len(response.get_data())
+
+    def close(self):
+        pass
+
+
+def run_scenario(transport, make_path, tokens, requests_total, clients, seed):
+    latencies, sizes, statuses = [], [], Counter()
+    lock = threading.Lock()
+
+    def client_loop(client_index):
+        rng = random.Random(seed * 1000 + client_index)
+        token = tokens[client_index % len(tokens)]
+        headers = {"Authorization": f"Bearer {token}"}
+        mine = requests_total // clients + (client_index < requests_total % clients)
+        local = []
+        for _ in range(mine):
+            path = make_path(rng)
+            started = time.perf_counter()
+            status, size = transport.get(path, headers)
+            local.append((time.perf_counter() - started, status, size))
+        with lock:
+            for latency, status, size in local:
+                latencies.append(latency)
+                statuses[status] += 1
+                sizes.append(size)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client_loop, range(clients)))
+    return summarize(latencies, statuses, sizes, time.perf_counter() - started)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario.")
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable).")
+    parser.add_argument("--transport", choices=["http", "inprocess"], default="http")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongomock", action="store_true")
+    parser.add_argument("--database", default="movieflix_bench_load")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    jwks = JWKSStub().start()
+    os.environ.update(jwks.environ())
+    os.environ["AZURE_STORAGE_CONNECTION_STRING"] = AZURITE_CONNECTION_STRING
+    # FLASK_ENV=development turns auth off; the benchmark measures it
+    os.environ["FLASK_ENV"] = "testing"
+    os.environ.setdefault("APP_ENV", "testing")
+
+    import app as app_package
+    from app.config import load_settings
+
+    if args.mongomock:
+        import mongomock
+        patch_mongomock()
+        app_package.MongoClient = mongomock.MongoClient
+    settings = load_settings(mongo_uri=os.getenv("MONGO_CLIENT", "mongodb://localhost:27017"),
+                             mongo_db=args.database,
+                             mongo_max_pool_size=max(args.clients * 2, 10))
+    app = app_package.create_app(settings)
+    database = app.extensions["mongo"].db
+
+    database.client.drop_database(args.database)
+    seed_started = time.perf_counter()
+    catalog = seed_catalog(database, movies=args.movies, users=args.users, seed=args.seed)
+    seed_seconds = time.perf_counter() - seed_started
+    if not args.mongomock:
+        from app.services.indexes import ensure_indexes
+        ensure_indexes(database)
+
+    tokens = [jwks.token(user_id) for user_id in catalog["user_ids"]]
+    transport = HttpTransport(app) if args.transport == "http" else InProcessTransport(app)
+    selected = scenarios(catalog)
+    if args.scenario:
+        unknown = set(args.scenario) - set(selected)
+        if unknown:
+            parser.error(f"unknown scenario(s) {', '.join(sorted(unknown))}; choose from {', '.join(selected)}")
+        selected = {name: selected[name] for name in args.scenario}
+
+    results = {}
+    try:
+        for index, (name, make_path) in enumerate(selected.items()):
+            if args.warmup:
+                run_scenario(transport, make_path, tokens, args.warmup, min(args.clients, args.warmup), args.seed + 7919)
+            results[name] = run_scenario(transport, make_path, tokens, args.requests, args.clients, args.seed + index)
+            print(f"{name}: {results[name]['throughput_rps']} req/s, p95 {results[name]['latency_ms']['p95']} ms",
+                  file=sys.stderr)
+    finally:
+        transport.close()
+        jwks.stop()
+        if not args.keep:
+            database.client.drop_database(args.database)
+
+    report = {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "backend": "mongomock" if args.mongomock else "mongod",
+        "transport": args.transport,
+        "params": {
+            "movies": args.movies, "users": args.users, "clients": args.clients,
+            "requests_per_scenario": args.requests, "warmup": args.warmup, "seed": args.seed,
+            "app_env": settings.env,
+        },
+        "seed_seconds": round(seed_seconds, 3),
+        "jwks_fetches": jwks.fetches,
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if any(result["errors"] for result in results.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
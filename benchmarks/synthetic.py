@@ -0,0 +1,145 @@
+# Deterministic synthetic catalog shaped like the TMDB collections the app reads.
+#
+#   from benchmarks.synthetic import seed_catalog
+#   summary = seed_catalog(database, movies=5000, users=200, seed=42)
+#
+# Writes movies_metadata, credits, keywords, ratings, rating_stats,
+# user_details and watchlists. The same seed always produces the same data so
+# runs on different commits see the same catalog.
+import random
+from collections import Counter, defaultdict
+from app.services.catalog import derived_fields
+
+GENRES = [
+    (28, "Action"), (12, "Adventure"), (16, "Animation"), (35, "Comedy"), (80, "Crime"),
+    (99, "Documentary"), (18, "Drama"), (10751, "Family"), (14, "Fantasy"), (36, "History"),
+    (27, "Horror"), (10402, "Music"), (9648, "Mystery"), (10749, "Romance"), (878, "Science Fiction"),
+    (10770, "TV Movie"), (53, "Thriller"), (10752, "War"), (37, "Western"),
+]
+
+WORDS = [
+    "night", "city", "love", "war", "star", "dark", "house", "blood", "king", "girl", "dead", "world",
+    "last", "man", "time", "secret", "lost", "return", "story", "game", "life", "island", "fire", "sea",
+    "ghost", "shadow", "heart", "dream", "river", "summer", "winter", "machine", "legend", "empire",
+    "matrix", "hunter", "storm", "silent", "golden", "broken", "wild", "iron", "paper", "glass",
+    "midnight", "paradise", "escape", "revenge", "journey", "mirror",
+]
+
+KEYWORDS = [
+    "hacker", "based on novel", "murder", "friendship", "new york", "robot", "time travel", "revenge",
+    "heist", "small town", "dystopia", "alien", "high school", "road trip", "serial killer", "space",
+    "love triangle", "biography", "superhero", "world war ii", "detective", "vampire", "zombie",
+    "prison", "wedding", "family", "kidnapping", "martial arts", "conspiracy", "music",
+]
+
+CREW_JOBS = ["Director", "Producer", "Screenplay", "Writer", "Original Music Composer",
+             "Director of Photography", "Editor", "Casting", "Art Direction", "Costume Design",
+             "Sound Designer", "Grip", "Gaffer", "Stunts"]
+
+POPULATION = {"actors": 20000, "crew": 10000}
+
+
+def make_movie(rng, movie_id):
+    title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+    year = rng.randint(1920, 2024)
+    movie = {
+        "id": str(movie_id),
+        "title": title,
+        "original_title": title,
+        "overview": " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80))).capitalize() + ".",
+        "tagline": " ".join(rng.choice(WORDS) for _ in range(6)).capitalize() + ".",
+        "genres": [{"id": genre_id, "name": name} for genre_id, name in rng.sample(GENRES, rng.randint(1, 3))],
+        "popularity": round(rng.paretovariate(1.5), 6),
+        "vote_average": round(rng.uniform(1, 10), 1),
+        "vote_count": int(rng.paretovariate(1.2) * 10),
+        "release_date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "revenue": rng.choice([0, 0, rng.randint(10 ** 5, 10 ** 9)]),
+        "runtime": rng.randint(70, 200),
+        "original_language": rng.choice(["en", "en", "en", "fr", "es", "ja", "de"]),
+        "adult": "False",
+        "status": "Released",
+    }
+    # As `flask backfill-derived-fields` would set them
+    movie.update(derived_fields(movie))
+    return movie
+
+
+def make_credits(rng, movie_id, cast_size, crew_size):
+    return {
+        "id": str(movie_id),
+        "cast": [
+            {"id": rng.randint(1, POPULATION["actors"]), "name": f"Actor {i}", "character": f"Role {i}",
+             "order": i, "gender": rng.randint(0, 2), "profile_path": f"/a{movie_id}_{i}.jpg"}
+            for i in range(cast_size)
+        ],
+        "crew": [
+            {"id": POPULATION["actors"] + rng.randint(1, POPULATION["crew"]), "name": f"Crew {i}",
+             "job": CREW_JOBS[0] if i == 0 else rng.choice(CREW_JOBS), "department": "Crew",
+             "profile_path": None}
+            for i in range(crew_size)
+        ],
+    }
+
+
+def make_keywords(rng, movie_id):
+    return {
+        "id": str(movie_id),
+        "keywords": [{"id": KEYWORDS.index(name) + 1, "name": name}
+                     for name in rng.sample(KEYWORDS, rng.randint(0, 6))],
+    }
+
+
+def rating_summary(ratings):
+    histogram = Counter(str(int(round(rating["rating"] * 2))) for rating in ratings)
+    return {"count": len(ratings), "sum": sum(rating["rating"] for rating in ratings), "histogram": dict(histogram)}
+
+
+def seed_catalog(database, movies=5000, users=200, seed=42, cast_size=40, crew_size=80,
+                 ratings_per_user=50, watchlist_size=30, liked_movies=40, batch_size=1000):
+    rng = random.Random(seed)
+    movie_ids = list(range(1, movies + 1))
+
+    def insert(collection, docs):
+        for start in range(0, len(docs), batch_size):
+            collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+    insert(database.movies_metadata, [make_movie(rng, movie_id) for movie_id in movie_ids])
+    insert(database.credits, [make_credits(rng, movie_id, cast_size, crew_size) for movie_id in movie_ids])
+    insert(database.keywords, [make_keywords(rng, movie_id) for movie_id in movie_ids])
+
+    user_ids = [f"bench_user_{i}" for i in range(users)]
+    ratings = []
+    by_movie = defaultdict(list)
+    for user_id in user_ids:
+        for movie_id in rng.sample(movie_ids, min(ratings_per_user, movies)):
+            rating = {"movieId": str(movie_id), "userId": user_id, "rating": rng.randint(1, 10) / 2,
+                      "timestamp": rng.randint(10 ** 9, 17 * 10 ** 8)}
+            ratings.append(rating)
+            by_movie[rating["movieId"]].append(rating)
+    insert(database.ratings, ratings)
+    insert(database.rating_stats, [{"_id": movie_id, **rating_summary(rated)} for movie_id, rated in by_movie.items()])
+
+    insert(database.user_details, [
+        {
+            "user_id": user_id,
+            "movie_ids": [{"movie_id": str(movie_id), "preference": rng.choice(["Like", "Like", "Dislike"])}
+                          for movie_id in rng.sample(movie_ids, min(liked_movies, movies))],
+            "actor_ids": rng.sample(range(1, POPULATION["actors"]), 10),
+            "genre_ids": [genre_id for genre_id, _ in rng.sample(GENRES, 3)],
+        }
+        for user_id in user_ids
+    ])
+    insert(database.watchlists, [
+        {"user_id": user_id, "movie_ids": [str(movie_id) for movie_id in rng.sample(movie_ids, min(watchlist_size, movies))]}
+        for user_id in user_ids
+    ])
+
+    return {
+        "movies": movies,
+        "users": users,
+        "ratings": len(ratings),
+        "movie_ids": [str(movie_id) for movie_id in movie_ids],
+        "user_ids": user_ids,
+        "title_words": WORDS,
+        "keywords": KEYWORDS,
+    }
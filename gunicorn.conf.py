@@ -0,0 +1,64 @@
+# Production server: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Settings come from the same environment as the app (APP_ENV, MONGO_CLIENT,
+# DRAIN_SECONDS, ...) plus PORT, WEB_CONCURRENCY and GUNICORN_THREADS. Runs
+# without Mongo or Azure reachable: workers boot, /healthz answers and /readyz
+# reports 503 until Mongo is up. `python run.py` is still the dev server.
+import multiprocessing
+import os
+import signal
+import threading
+
+from app.config import load_settings
+
+settings = load_settings()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+timeout = 30
+keepalive = 5
+# Drain window plus time for in-flight requests before the master kills a worker
+graceful_timeout = settings.drain_seconds + 30
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+# create_app opens a MongoClient, which must not be shared across fork, so
+# each worker builds its own app. Mongo pools are per worker:
+# MONGO_MAX_POOL_SIZE x workers connections per host at most.
+preload_app = False
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        raise RuntimeError("The app opens its MongoClient in create_app; preload_app is not supported")
+
+
+def post_worker_init(worker):
+    from app.services.lifecycle import begin_drain, is_draining, warm_up
+
+    warm_up(worker.wsgi, notify=worker.notify)
+
+    # SIGTERM: fail /readyz at once, keep serving through the drain window,
+    # then let gunicorn stop accepting and finish in-flight requests
+    stop = worker.handle_exit
+
+    def handle_term(sig, frame):
+        # The master may signal more than once; only the first starts the timer
+        if not worker.alive or is_draining():
+            return
+        worker.log.info("Draining worker %s for %ss", worker.pid, settings.drain_seconds)
+        begin_drain()
+        timer = threading.Timer(settings.drain_seconds, stop, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    app = getattr(worker, "wsgi", None)
+    if app is not None:
+        app.extensions["mongo"].close()
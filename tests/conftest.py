@@ -0,0 +1,75 @@
+# Unit and route tests on mongomock; no Mongo, Azure or Clerk needed.
+#
+#   pip install -r requirements-dev.txt
+#   python -m pytest
+import os
+import sys
+
+import mongomock
+import mongomock.aggregate
+import mongomock.collection
+import mongomock.gridfs
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The well-known Azurite development account; SAS signing is local, so
+# nothing has to listen on it
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+def patch_mongomock():
+    # Fills the gaps mongomock has for the pipelines the app runs
+    mongomock.gridfs.enable_gridfs_integration()
+
+    # mongomock rewrites projection dicts in place, which races when the app
+    # passes a shared constant such as ID_ONLY from several threads
+    find = mongomock.collection.Collection.find
+    if not getattr(find, "copies_projection", False):
+        def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+            if isinstance(projection, dict):
+                projection = dict(projection)
+            return find(self, filter, projection, *args, **kwargs)
+
+        find_with_copied_projection.copies_projection = True
+        mongomock.collection.Collection.find = find_with_copied_projection
+
+    handlers = mongomock.aggregate._PIPELINE_HANDLERS
+    if handlers.get("$unionWith") is None:
+        def union_with(in_collection, database, options):
+            if isinstance(options, str):
+                options = {"coll": options}
+            other = database[options["coll"]].aggregate(options.get("pipeline", []))
+            return list(in_collection) + list(other)
+
+        handlers["$unionWith"] = union_with
+
+
+patch_mongomock()
+
+
+@pytest.fixture
+def database():
+    return mongomock.MongoClient().movieflix_test
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # A full app on mongomock with auth off (FLASK_ENV=development) and an
+    # Azurite-shaped storage key, so signing works without network access
+    import app as app_package
+    from app.config import load_settings
+
+    monkeypatch.setenv("FLASK_ENV", "development")
+    monkeypatch.setenv("AZURE_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING)
+    monkeypatch.setattr(app_package, "MongoClient", mongomock.MongoClient)
+    return app_package.create_app(load_settings(environ={}, poster_cache_dir=""))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,36 @@
+import pytest
+
+from app.config import ConfigError, load_settings
+
+
+def test_profile_defaults_and_env_overrides():
+    settings = load_settings({"APP_ENV": "production", "MOVIE_CACHE_TTL": "30.5"})
+    assert settings.drain_seconds == 10
+    assert settings.movie_cache_ttl == 30.5
+    assert settings.mongo_compressors == ("zlib",)
+
+
+def test_compressors_need_their_module(monkeypatch):
+    import importlib.util
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None if name == "zstandard" else find_spec(name))
+    with pytest.raises(ConfigError, match="includes zstd, which needs the zstandard package"):
+        load_settings({"MONGO_COMPRESSORS": "zstd,zlib"})
+
+
+@pytest.mark.parametrize("environ, message", [
+    ({"FANOUT_WORKERS": "eight"}, "FANOUT_WORKERS must be an integer"),
+    ({"MOVIE_CACHE_TTL": "soon"}, "MOVIE_CACHE_TTL must be a number"),
+    ({"FANOUT_WORKERS": "0"}, "FANOUT_WORKERS must be at least 1"),
+    ({"JWKS_MISS_COOLDOWN": "-1"}, "JWKS_MISS_COOLDOWN must not be negative"),
+    ({"METRICS_ENABLED": "maybe"}, "METRICS_ENABLED must be true or false"),
+    ({"APP_ENV": "staging"}, "APP_ENV must be one of"),
+    ({"MONGO_COMPRESSORS": "lz4"}, "MONGO_COMPRESSORS has unknown values lz4"),
+])
+def test_bad_values_raise_config_error(environ, message):
+    with pytest.raises(ConfigError, match=message):
+        load_settings(environ)
+
+
+def test_empty_poster_cache_dir_turns_the_cache_off():
+    assert load_settings({"POSTER_CACHE_DIR": ""}).poster_cache_dir == ""
@@ -0,0 +1,57 @@
+from app.services.indexes import explain_query, query_shapes, sample_values
+from app.services.movie import credits_pipeline
+from app.services.user_context import user_documents_pipeline
+
+
+class ExplainingDatabase:
+    # Answers explain with a canned document, like a server would
+    def __init__(self, explained):
+        self.explained = explained
+        self.commands = []
+
+    def command(self, name, command, **kwargs):
+        self.commands.append(command)
+        return self.explained
+
+
+def cursor_stage(stage, docs, keys):
+    return {"$cursor": {
+        "queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": stage}}}},
+        "executionStats": {"nReturned": 1, "totalDocsExamined": docs, "totalKeysExamined": keys},
+    }}
+
+
+def test_shapes_use_the_routes_pipelines(database):
+    values = sample_values(database)
+    shapes = {label: (collection_name, query) for label, collection_name, query, _, _ in query_shapes(values)}
+    assert shapes["user documents"] == ("user_details", user_documents_pipeline(values["user_id"]))
+    assert shapes["credits by ids"] == ("credits", credits_pipeline([values["movie_id"]]))
+
+
+def test_explain_covers_union_with_pipelines():
+    database = ExplainingDatabase({"stages": [
+        cursor_stage("IXSCAN", 1, 1),
+        {"$set": {}},
+        {"$unionWith": {"coll": "watchlists", "pipeline": [cursor_stage("COLLSCAN", 500, 0), {"$set": {}}]}},
+    ]})
+    pipeline = user_documents_pipeline("u1")
+    explained = explain_query(database, "user_details", pipeline)
+
+    assert database.commands == [{"aggregate": "user_details", "pipeline": pipeline, "cursor": {}}]
+    assert explained["collscan"]
+    assert explained["plan"] == "LIMIT>FETCH>IXSCAN + LIMIT>FETCH>COLLSCAN"
+    assert explained["docs_examined"] == 501
+    assert explained["keys_examined"] == 1
+
+
+def test_explain_find():
+    database = ExplainingDatabase({
+        "queryPlanner": {"winningPlan": {"queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}},
+        "executionStats": {"nReturned": 3, "totalDocsExamined": 3, "totalKeysExamined": 3},
+    })
+    explained = explain_query(database, "ratings", {"movieId": "1"}, [("timestamp", -1)], 100)
+
+    assert database.commands == [{"find": "ratings", "filter": {"movieId": "1"}, "sort": {"timestamp": -1}, "limit": 100}]
+    assert not explained["collscan"]
+    assert explained["plan"] == "FETCH>IXSCAN"
+    assert explained["returned"] == 3
@@ -0,0 +1,95 @@
+import base64
+
+import pytest
+from bson import ObjectId, Regex
+from pymongo import ASCENDING, DESCENDING
+
+from app.utils.helper import encode_cursor, keyset_filter, keyset_paginate
+
+
+@pytest.fixture
+def movies(database):
+    # Ties and missing values on the sort field, the cases the $or clauses handle
+    popularity = [5, 3, None, 5, 1, None, 3, 5, 2, None, 4, 1]
+    database.movies_metadata.insert_many([
+        {"_id": ObjectId(f"{i + 1:024x}"), "id": str(i), **({} if value is None else {"popularity": value})}
+        for i, value in enumerate(popularity)
+    ])
+    return database.movies_metadata
+
+
+def walk(collection, sort_field, direction, limit):
+    seen, cursor = [], ""
+    while cursor is not None:
+        docs, cursor = keyset_paginate(collection, {}, sort_field, direction, cursor, limit, {"id": 1})
+        seen.extend(doc["id"] for doc in docs)
+    return seen
+
+
+@pytest.mark.parametrize("direction", [ASCENDING, DESCENDING])
+@pytest.mark.parametrize("limit", [1, 2, 5, 20])
+def test_keyset_pages_match_a_full_sort(movies, direction, limit):
+    expected = [doc["id"] for doc in movies.find({}, {"id": 1}).sort([("popularity", direction), ("_id", direction)])]
+    assert walk(movies, "popularity", direction, limit) == expected
+
+
+def test_keyset_pages_on_id(movies):
+    assert walk(movies, "_id", DESCENDING, 3) == [str(i) for i in reversed(range(12))]
+
+
+def test_keyset_filter_after_a_missing_value_descending():
+    last_id = ObjectId()
+    assert keyset_filter("popularity", DESCENDING, encode_cursor([None, last_id])) == {
+        "$or": [{"popularity": None, "_id": {"$lt": last_id}}]
+    }
+
+
+def test_keyset_filter_descending_keeps_missing_values_last():
+    last_id = ObjectId()
+    assert keyset_filter("popularity", DESCENDING, encode_cursor([3, last_id])) == {"$or": [
+        {"popularity": {"$lt": 3}},
+        {"popularity": 3, "_id": {"$lt": last_id}},
+        {"popularity": None},
+    ]}
+
+
+def test_invalid_cursor_is_rejected(movies):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        keyset_paginate(movies, {}, "popularity", DESCENDING, "not-a-cursor", 5)
+
+
+@pytest.mark.parametrize("values", [
+    [{"$ne": None}, ObjectId()],
+    [[1, 2], ObjectId()],
+    [Regex("."), ObjectId()],
+    [5, {"$gt": ""}],
+    [5, "not-an-object-id"],
+    [5],
+])
+def test_crafted_cursors_are_rejected(values):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        keyset_filter("popularity", DESCENDING, encode_cursor(values))
+
+
+@pytest.mark.parametrize("raw", ['[5, {"$oid": "zz"}]', '[{"$numberDecimal": "x"}, null]', '[{"$binary": 1}, null]'])
+def test_cursors_that_fail_to_parse_are_rejected(raw):
+    cursor = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        keyset_filter("popularity", DESCENDING, cursor)
+
+
+def test_keyset_pages_on_a_dotted_field(database):
+    database.movies_metadata.insert_many([
+        {"_id": ObjectId(f"{i + 1:024x}"), "id": str(i), "stats": {} if value is None else {"views": value}}
+        for i, value in enumerate([3, 1, None, 3, 2, 5])
+    ])
+    collection = database.movies_metadata
+    expected = [doc["id"] for doc in collection.find({}, {"id": 1}).sort([("stats.views", -1), ("_id", -1)])]
+    assert walk(collection, "stats.views", DESCENDING, 2) == expected
+
+
+def test_movie_list_answers_400_for_a_crafted_cursor(client):
+    cursor = encode_cursor([{"$ne": None}, ObjectId()])
+    response = client.get(f"/movies/list?sort_by=popularity&cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.indexes import ensure_indexes
+from app.services.preferences import (
+    ADDED, CREATED, DUPLICATE, EXISTS, INVALID, NOT_FOUND,
+    add_to_set, parse_movie_id, push_movie_entries, push_movie_entry, screen_ids,
+)
+
+
+def test_concurrent_adds_store_each_id_once(database):
+    # Same check as benchmarks/concurrent_mutations.py: every id is added
+    # twice from parallel threads and must end up stored exactly once
+    ensure_indexes(database)
+    user_id = "concurrency_user"
+    ids = [str(i) for i in range(200)] * 2
+
+    def add(movie_id):
+        movie = push_movie_entry(user_id, {"movie_id": movie_id, "preference": "Like"}, database.user_details)
+        actor = add_to_set(database.user_details, user_id, "actor_ids", int(movie_id))
+        watchlist = add_to_set(database.watchlists, user_id, "movie_ids", movie_id)
+        return movie, actor, watchlist
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(add, ids))
+
+    details = list(database.user_details.find({"user_id": user_id}))
+    watchlists = list(database.watchlists.find({"user_id": user_id}))
+    assert len(details) == 1
+    assert len(watchlists) == 1
+    stored_movies = [entry["movie_id"] for entry in details[0]["movie_ids"]]
+    assert sorted(stored_movies) == sorted(set(ids))
+    assert sorted(details[0]["actor_ids"]) == list(range(200))
+    assert sorted(watchlists[0]["movie_ids"]) == sorted(set(ids))
+    assert sum(movie == EXISTS for movie, _, _ in statuses) == 200
+
+
+def test_push_movie_entry_statuses(database):
+    collection = database.user_details
+    entry = {"movie_id": "1", "preference": "Like"}
+    assert push_movie_entry("u1", entry, collection) == CREATED
+    assert push_movie_entry("u1", {"movie_id": "2", "preference": "Dislike"}, collection) == ADDED
+    assert push_movie_entry("u1", {"movie_id": "1", "preference": "Dislike"}, collection) == EXISTS
+    assert collection.find_one({"user_id": "u1"})["movie_ids"] == [entry, {"movie_id": "2", "preference": "Dislike"}]
+
+
+def test_push_movie_entries_retries_without_movies_added_meanwhile(database):
+    collection = database.user_details
+    collection.insert_one({"user_id": "u1", "movie_ids": [{"movie_id": "2", "preference": "Dislike"}]})
+    entries = [{"movie_id": movie_id, "preference": "Like"} for movie_id in ("1", "2", "3")]
+
+    assert push_movie_entries("u1", entries, collection) == {"1", "3"}
+    stored = collection.find_one({"user_id": "u1"})["movie_ids"]
+    assert [entry["movie_id"] for entry in stored] == ["2", "1", "3"]
+    assert stored[0]["preference"] == "Dislike"
+
+    assert push_movie_entries("u1", entries, collection) == set()
+    assert len(collection.find_one({"user_id": "u1"})["movie_ids"]) == 3
+
+
+def test_screen_ids_statuses_in_request_order():
+    lookups = []
+
+    def lookup(ids):
+        lookups.append(sorted(ids))
+        return {"1", "2"}
+
+    screened = screen_ids([1, "2", " 1 ", True, "", "3", None], parse_movie_id, lookup)
+    assert screened == [
+        (1, "1", None),
+        ("2", "2", None),
+        (" 1 ", "1", DUPLICATE),
+        (True, None, INVALID),
+        ("", None, INVALID),
+        ("3", "3", NOT_FOUND),
+        (None, None, INVALID),
+    ]
+    assert lookups == [["1", "2", "3"]]
+
+
+def test_screen_ids_skips_lookup_without_valid_ids():
+    def lookup(ids):
+        raise AssertionError("lookup should not run")
+
+    assert screen_ids([None, ""], parse_movie_id, lookup) == [(None, None, INVALID), ("", None, INVALID)]
@@ -0,0 +1,154 @@
+import pytest
+
+from app.config import load_settings
+
+
+@pytest.fixture
+def catalog(app):
+    database = app.extensions["mongo"].db
+    database.movies_metadata.insert_many([
+        {"id": str(i), "title": f"Movie {i}", "popularity": i, "release_date": f"{1990 + i}-01-01",
+         "genres": [{"id": 28, "name": "Action"}]}
+        for i in range(1, 6)
+    ])
+    database.ratings.insert_many([
+        {"movieId": "1", "userId": user_id, "rating": 4.0, "timestamp": 1000 + user_id} for user_id in range(12)
+    ])
+    # rebuild_rating_stats uses $round, which mongomock lacks
+    database.rating_stats.insert_one({"_id": "1", "count": 12, "sum": 48.0, "histogram": {"8": 12}})
+    return database
+
+
+@pytest.mark.parametrize("query, message", [
+    ("limit=0", "limit must be between 1 and 100"),
+    ("limit=101", "limit must be between 1 and 100"),
+    ("limit=ten", "limit must be a number"),
+    ("page=0", "page must be at least 1"),
+    ("page=-2", "page must be at least 1"),
+])
+def test_ratings_pagination_is_validated(client, catalog, query, message):
+    response = client.get(f"/movies/movie/1/ratings?{query}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": message}
+
+
+def test_ratings_pages(client, catalog):
+    body = client.get("/movies/movie/1/ratings?page=2&limit=5").get_json()
+    assert body["total_pages"] == 3
+    assert body["total_ratings"] == 12
+    assert [rating["userId"] for rating in body["ratings"]] == [6, 5, 4, 3, 2]
+
+
+def test_movie_details_validates_ratings_limit(client, catalog):
+    response = client.get("/movies/movie/1?include_ratings=true&ratings_limit=0")
+    assert response.status_code == 400
+
+
+def test_apps_do_not_share_search_data(app):
+    import app as app_package
+    other = app_package.create_app(load_settings(environ={}, poster_cache_dir=""))
+    app.extensions["mongo"].db.movies_metadata.insert_one({"id": "1", "title": "Alpha"})
+    other.extensions["mongo"].db.movies_metadata.insert_one({"id": "1", "title": "Bravo"})
+
+    def titles(flask_app, keyword):
+        body = flask_app.test_client().get(f"/movies/list?keyword={keyword}").get_json()
+        return [movie["title"] for movie in body["movies"]]
+
+    assert titles(app, "alpha") == ["Alpha"]
+    assert titles(app, "bravo") == []
+    assert titles(other, "bravo") == ["Bravo"]
+    assert titles(other, "alpha") == []
+
+
+def test_health_and_metrics_skip_the_catalog_version_check(app, client, monkeypatch):
+    checks = []
+    monkeypatch.setattr(app.extensions["catalog_version"], "check", lambda: checks.append(1))
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/metrics").status_code == 200
+    assert checks == []
+    client.get("/movies/list")
+    assert checks == [1]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("limit=0", "limit must be between 1 and 100"),
+    ("limit=x", "limit must be a number"),
+    ("limit=5&page=0", "page must be at least 1"),
+])
+def test_user_preference_pagination_is_validated(client, catalog, query, message):
+    response = client.get(f"/user/user_preference?{query}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": message}
+
+
+def test_user_preference_pages(client, catalog):
+    catalog.watchlists.insert_one({"user_id": "dev_user", "movie_ids": ["1", "2", "3", "4", "5"]})
+    body = client.get("/user/user_preference?section=watchlisted_movies&page=2&limit=2").get_json()
+    assert [movie["id"] for movie in body["watchlisted_movies"]] == ["3", "4"]
+    assert body["total_pages"] == {"watchlisted_movies": 3}
+
+
+@pytest.mark.parametrize("rating, message", [
+    ("nan", "rating must be a number"),
+    ("inf", "rating must be a number"),
+    (5.5, "rating must be between 0.5 and 5 in half-star steps"),
+    (None, "rating is required"),
+])
+def test_bad_ratings_are_rejected(client, catalog, rating, message):
+    response = client.post("/movies/movie/1/rating", json={"rating": rating})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": message}
+
+
+@pytest.fixture
+def poster(app):
+    # The app fixture runs with the poster disk cache off, so posters are
+    # streamed straight from GridFS
+    from gridfs import GridFS
+    data = bytes(range(256)) * 4
+    GridFS(app.extensions["mongo"].catalog_db).put(data, filename="1", content_type="image/jpeg")
+    return data
+
+
+def test_poster_range_request_without_disk_cache(client, poster):
+    response = client.get("/movies/poster/1", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(poster)}"
+    assert response.data == poster[100:200]
+
+    full = client.get("/movies/poster/1")
+    assert full.status_code == 200
+    assert full.headers["Accept-Ranges"] == "bytes"
+    assert full.content_length == len(poster)
+    assert full.data == poster
+
+    assert client.get("/movies/poster/1", headers={"If-None-Match": full.headers["ETag"]}).status_code == 304
+    assert client.get("/movies/poster/1", headers={"Range": f"bytes={len(poster)}-"}).status_code == 416
+
+
+def test_readyz_waits_for_the_search_index(app, client):
+    search = app.extensions["search_index"]
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json()["search"] == "building"
+    # The first /readyz started the build; wait for the thread to finish
+    with search._build_lock:
+        pass
+    assert search.ready
+    assert client.get("/readyz").status_code == 200
+
+
+def test_warm_up_notifies_after_every_step(app, monkeypatch):
+    from app.services import indexes
+    from app.services.lifecycle import warm_up
+
+    ensured = []
+    monkeypatch.setattr(indexes, "ensure_indexes", lambda notify=None: ensured.append(notify))
+    app.config["SETTINGS"] = load_settings(environ={}, poster_cache_dir="", ensure_indexes_on_start=True)
+    calls = []
+    warm_up(app, notify=lambda: calls.append(1))
+    assert ensured and ensured[0] is not None
+    assert len(calls) >= 3
+    with app.extensions["search_index"]._build_lock:
+        pass
+    assert app.extensions["search_index"].ready
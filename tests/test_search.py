@@ -0,0 +1,93 @@
+import pytest
+
+from app.services.search import SearchIndex, edit_distance
+
+
+@pytest.fixture
+def index(database):
+    database.movies_metadata.insert_many([
+        {"id": "1", "title": "The Matrix", "popularity": 50},
+        {"id": "2", "title": "The Matrix Reloaded", "popularity": 30},
+        {"id": "3", "title": "Hackers", "popularity": 10},
+        {"id": "4", "title": "Sneakers", "popularity": 20},
+        {"id": "5", "title": "Matrimony", "popularity": 90},
+    ])
+    database.keywords.insert_many([
+        {"id": "3", "keywords": [{"name": "computer hacker"}]},
+        {"id": "4", "keywords": [{"name": "hacker"}, {"name": "heist"}]},
+    ])
+    return SearchIndex(database=database)
+
+
+def test_exact_title_ranks_first(index):
+    assert index.search("the matrix") == (["1", "2"], 2)
+
+
+def test_title_match_beats_keyword_match(index):
+    assert index.search("hacker")[0] == ["3", "4"]
+
+
+def test_keyword_matches_rank_by_popularity(index):
+    assert index.search("heist") == (["4"], 1)
+
+
+def test_prefix_matches(index):
+    ids, total = index.search("matri")
+    assert set(ids) == {"1", "2", "5"}
+    assert total == 3
+
+
+def test_typos_fall_back_to_fuzzy_matches(index):
+    assert index.search("matrx reloded")[0] == ["2"]
+    assert index.search("sneekers")[0] == ["4"]
+
+
+def test_every_token_has_to_match(index):
+    assert index.search("matrix heist") == ([], 0)
+
+
+def test_pagination_and_total(index):
+    first, total = index.search("matri", 0, 2)
+    second, _ = index.search("matri", 2, 2)
+    assert total == 3
+    assert len(first) == 2
+    assert set(first + second) == {"1", "2", "5"}
+
+
+def test_refresh_picks_up_new_movies(index, database):
+    index.search("matrix")
+    database.movies_metadata.insert_one({"id": "6", "title": "The Matrix Resurrections", "popularity": 5})
+    index.refresh_seconds = 0
+    assert "6" in index.search("resurrections")[0]
+
+
+def test_refreshed_terms_stay_sorted_for_prefix_matches(index, database):
+    index.search("matrix")
+    database.movies_metadata.insert_one({"id": "6", "title": "Aardvark Zzyzx", "popularity": 5})
+    index.refresh_seconds = 0
+    assert "6" in index.search("aardv")[0]
+    assert "6" in index.search("zzy")[0]
+    assert index.terms == sorted(set(index.terms))
+
+
+def test_rebuild_drops_edited_titles(index, database):
+    index.search("matrix")
+    database.movies_metadata.update_one({"id": "5"}, {"$set": {"title": "Wedding Bells"}})
+    index.rebuild()
+    assert "5" not in index.search("matrimony")[0]
+    assert index.search("wedding")[0] == ["5"]
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("matrix", "matrix", 0),
+    ("matrix", "matrx", 1),
+    ("matrix", "mtarix", 1),
+    ("reloaded", "reloded", 1),
+    ("kitten", "sitting", 3),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 3) == distance
+
+
+def test_edit_distance_gives_up_past_the_limit():
+    assert edit_distance("matrix", "hackers", 1) == 2
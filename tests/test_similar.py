@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.services.similar import SimilarIndex, build_index, hash_params, minhash_signatures
+
+
+def keywords(*ids):
+    return [{"id": keyword_id, "name": f"k{keyword_id}"} for keyword_id in ids]
+
+
+@pytest.fixture
+def index(database, tmp_path):
+    database.keywords.insert_many([
+        {"id": "a", "keywords": keywords(1, 2, 3, 4)},
+        {"id": "b", "keywords": keywords(1, 2, 3, 4)},
+        {"id": "c", "keywords": keywords(1, 2, 3, 4, 5)},
+        {"id": "d", "keywords": keywords(90, 91)},
+        {"id": "e", "keywords": []},
+    ])
+    return build_index(str(tmp_path / "similar"), database=database)
+
+
+def test_similar_returns_exact_jaccard_best_first(index):
+    assert index.similar("a") == [("b", 1.0), ("c", 0.8)]
+
+
+def test_similar_respects_limit(index):
+    assert index.similar("a", limit=1) == [("b", 1.0)]
+
+
+def test_movies_without_shared_keywords_are_not_similar(index):
+    assert index.similar("d") == []
+
+
+def test_unindexed_movies(index):
+    # No keywords or unknown id: the route tells these apart with a lookup
+    assert index.similar("e") is None
+    assert index.similar("missing") is None
+
+
+def test_jaccard_is_exact_for_large_overlapping_keyword_sets(database, tmp_path):
+    # The candidates' token runs overlap, so the gathered array is full of
+    # repeats; every score must still match a plain set computation. Ids
+    # are spread out like real keyword ids, which numpy matches by sorting.
+    rng = np.random.default_rng(11)
+    pool = rng.choice(10 ** 9, 200, replace=False).tolist()
+    sets = {"query": set(pool[:60])}
+    for i in range(20):
+        sets[f"m{i}"] = set(rng.choice(pool[:60], 45, replace=False).tolist()) | set(pool[60 + i:70 + i])
+    database.keywords.insert_many([
+        {"id": movie_id, "keywords": keywords(*sorted(ids))} for movie_id, ids in sets.items()
+    ])
+    index = build_index(str(tmp_path / "similar"), database=database)
+
+    results = index.similar("query", limit=20)
+    assert len(results) == 20
+    for movie_id, score in results:
+        expected = len(sets["query"] & sets[movie_id]) / len(sets["query"] | sets[movie_id])
+        assert score == pytest.approx(expected)
+
+
+def test_current_points_at_the_latest_build(index, database, tmp_path):
+    database.keywords.insert_one({"id": "f", "keywords": keywords(1, 2, 3, 4)})
+    build_index(str(tmp_path / "similar"), database=database)
+    current = SimilarIndex.load_current(str(tmp_path / "similar" / "CURRENT"))
+    assert dict(current.similar("a"))["f"] == 1.0
+
+
+def test_minhash_agreement_estimates_jaccard():
+    rng = np.random.default_rng(7)
+    shared = rng.choice(100000, 300, replace=False)
+    left = np.sort(np.concatenate([shared, rng.choice(np.arange(100000, 200000), 100, replace=False)]))
+    right = np.sort(np.concatenate([shared, rng.choice(np.arange(200000, 300000), 100, replace=False)]))
+    indptr = np.array([0, len(left), len(left) + len(right)])
+    a, b = hash_params(512, seed=3)
+    signatures = minhash_signatures(indptr, np.concatenate([left, right]), a, b)
+    agreement = (signatures[0] == signatures[1]).mean()
+    assert abs(agreement - 300 / 500) < 0.08